@@ -18,6 +18,10 @@ if not os.getenv("PRIVATE_KEY"):
 # Now import and instantiate the client
 from alith import Agent, LazAIClient
 
+# Shared session bootstrap lives at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from session import bootstrap
+
 # 1. Join the iDAO, register user wallet on LazAI and deposit fees (Only Once)
 LAZAI_IDAO_ADDRESS = "0xc3e98E8A9aACFc9ff7578C2F3BA48CA4477Ecf49"
 
@@ -32,36 +36,19 @@ DEPOSIT_AMOUNT = 1000000  # Reduced from 10000000
 
 print(f"Using wallet address: {client.wallet.address}")
 
-try:
-    address = client.get_user(client.wallet.address)
-    print("User already exists", address)
-    # client.deposit_inference(LAZAI_IDAO_ADDRESS, DEPOSIT_AMOUNT)
-except Exception:
-    print("User does not exist, adding user")
-    try:
-        client.add_user(DEPOSIT_AMOUNT)
-        client.deposit(DEPOSIT_AMOUNT * 2)
-        print("Deposit successful")
-        client.deposit_inference(LAZAI_IDAO_ADDRESS, DEPOSIT_AMOUNT)
-        print(f"Successfully added user and deposited {DEPOSIT_AMOUNT}")
-    except Exception as e:
-        print("Error adding user or depositing:", e)
+# Registration, deposit, account and node url are cached locally; the chain is
+# only touched when the snapshot is stale or the account balance runs out
+session = bootstrap(
+    client, LAZAI_IDAO_ADDRESS, user_amount=DEPOSIT_AMOUNT, deposit_amount=DEPOSIT_AMOUNT
+)
+print("Inference account balance:", session.balance, "(cached)" if session.cached else "")
 
 
 # 2. Request the inference server with the settlement headers and DAT file id
 file_id = 10  # Use the File ID you received from the Data Contribution step
-url = client.get_inference_node(LAZAI_IDAO_ADDRESS)[1]
+url = session.url
 print("url", url)
 
-# Check if the user has an account with the inference node
-try:
-    account = client.get_inference_account(client.wallet.address, LAZAI_IDAO_ADDRESS)
-    print("Inference account:", account)
-    if not account or account[0] != client.wallet.address:
-        print("Warning: User account not found with inference node. This may cause authentication errors.")
-except Exception as e:
-    print("Error checking inference account:", e)
-
 agent = Agent(
     # Note: replace with your model here
     model="llama-3.3-70b-versatile",
@@ -70,4 +57,5 @@ agent = Agent(
     # Extra headers for settlement and DAT file anchoring
     extra_headers=client.get_request_headers(LAZAI_IDAO_ADDRESS, file_id=file_id),
 )
+# Not streamed: the settlement node bills tokens by parsing the whole response body as JSON
 print(agent.prompt("what is it?"))
\ No newline at end of file
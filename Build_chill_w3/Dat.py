@@ -11,13 +11,27 @@ from os import getenv
 from dotenv import load_dotenv
 load_dotenv()
 import asyncio
+import base64
+import os
+import random
 import requests
 import rsa
 import aiohttp
 from pydantic import BaseModel
 from typing import Optional
+from urllib.parse import urljoin
 import hashlib
 
+from dedup import DedupIndex
+from journal import Journal
+from txpool import (
+    FILE_ADDED_TOPIC,
+    JOB_SUBMITTED_TOPIC,
+    REWARD_GAS,
+    TxSubmitter,
+    first_indexed_uint,
+)
+
 
 class ActualPinataUploadResponse(BaseModel):
     id: str
@@ -36,40 +50,207 @@ class ActualPinataUploadResponse(BaseModel):
     group_id: Optional[str] = None
 
 
+PINATA_UPLOAD_URL = "https://uploads.pinata.cloud/v3/files"
+PINATA_API_URL = "https://api.pinata.cloud/v3/files"
+# Pinata accepts resumable (TUS) uploads for large files in chunks of this size
+RESUMABLE_CHUNK_SIZE = 50 * 1024 * 1024
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class RetryableUploadError(StorageError):
+    pass
+
+
 class CustomPinataIPFS(PinataIPFS):
-    async def upload(self, opts: UploadOptions):
-        url = "https://uploads.pinata.cloud/v3/files"
+    """Pinata uploader that streams the request body instead of buffering it.
+
+    `UploadOptions.data` may be bytes, a memoryview, a file path, an async
+    iterator of bytes or a zero-argument callable returning one. Paths and
+    memoryviews are sent straight from the file or buffer, and files larger
+    than `resumable_threshold` go through Pinata's resumable (TUS) endpoint
+    chunk by chunk. Failed attempts are retried with exponential backoff; a
+    bare async iterator can only be consumed once, so it is not retried.
+    """
 
+    def __init__(
+        self,
+        upload_url: str = PINATA_UPLOAD_URL,
+        api_url: str = PINATA_API_URL,
+        retries: int = 3,
+        backoff: float = 1.0,
+        chunk_size: int = 256 * 1024,
+        resumable_threshold: Optional[int] = None,
+        resumable_chunk_size: int = RESUMABLE_CHUNK_SIZE,
+    ):
+        super().__init__()
+        self.upload_url = upload_url
+        self.api_url = api_url
+        self.retries = retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+        self.resumable_threshold = resumable_threshold
+        self.resumable_chunk_size = resumable_chunk_size
+
+    async def upload(self, opts: UploadOptions, content_type: str = "text/plain"):
+        data = opts.data
+        size = _known_size(data)
+        if self.resumable_threshold is not None and size is not None and size > self.resumable_threshold:
+            # Shared across attempts so a retry resumes instead of restarting
+            state = {}
+            return await self._retry(
+                self._upload_resumable, opts, size, content_type, state,
+                progress=lambda: state.get("offset", 0),
+            )
+        retries = 0 if hasattr(data, "__aiter__") else self.retries
+        return await self._retry(self._upload_form, opts, content_type, retries=retries)
+
+    async def _retry(self, attempt, *args, retries: Optional[int] = None, progress=None):
+        """Run `attempt` until it succeeds, backing off between failures.
+
+        `progress` reports how far the upload got; an attempt that moved it
+        forward starts the retry budget afresh.
+        """
+        retries = self.retries if retries is None else retries
+        failures = 0
+        reached = progress() if progress else None
+        while True:
+            try:
+                return await attempt(*args)
+            except (RetryableUploadError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if progress and progress() != reached:
+                    reached, failures = progress(), 0
+                if failures == retries:
+                    if isinstance(e, StorageError):
+                        raise
+                    raise StorageError(f"Network error: {str(e)}") from e
+                await asyncio.sleep(self.backoff * 2**failures * random.uniform(0.5, 1.5))
+                failures += 1
+
+    def _body(self, data):
+        if isinstance(data, (str, os.PathLike)):
+            return open(data, "rb")
+        if isinstance(data, memoryview):
+            return _iter_view(data, self.chunk_size)
+        if callable(data):
+            return data()
+        return data
+
+    def _check(self, response, error_text: str):
+        if response.status in RETRYABLE_STATUSES:
+            raise RetryableUploadError(f"Pinata IPFS API error ({response.status}): {error_text}")
+        raise StorageError(f"Pinata IPFS API error: {error_text}")
+
+    async def _upload_form(self, opts: UploadOptions, content_type: str):
+        body = self._body(opts.data)
         form = aiohttp.FormData()
-        form.add_field("file", opts.data, filename=opts.name, content_type="text/plain")
+        form.add_field("file", body, filename=opts.name, content_type=content_type)
         form.add_field("network", "public")
 
         headers = {"Authorization": f"Bearer {opts.token}"}
 
         try:
-            async with self.client.post(url, data=form, headers=headers) as response:
+            async with self.client.post(self.upload_url, data=form, headers=headers) as response:
                 if response.status != 200:
-                    error_text = await response.text()
-                    raise StorageError(f"Pinata IPFS API error: {error_text}")
+                    self._check(response, await response.text())
 
                 data = await response.json()
-                # Use the actual response structure instead of the broken model
-                pinata_response = ActualPinataUploadResponse(**data["data"])
+                return _file_metadata(data["data"])
+        finally:
+            if hasattr(body, "close") and not hasattr(body, "__aiter__"):
+                body.close()
+
+    async def _upload_resumable(self, opts: UploadOptions, size: int, content_type: str, state: dict):
+        headers = {"Authorization": f"Bearer {opts.token}", "Tus-Resumable": "1.0.0"}
+        location = state.get("location")
+        if location is None:
+            metadata = {"filename": opts.name, "filetype": content_type, "network": "public"}
+            create_headers = {
+                **headers,
+                "Upload-Length": str(size),
+                "Upload-Metadata": ",".join(
+                    f"{k} {base64.b64encode(v.encode()).decode()}" for k, v in metadata.items()
+                ),
+            }
+            async with self.client.post(self.upload_url, headers=create_headers) as response:
+                if response.status not in (200, 201):
+                    self._check(response, await response.text())
+                location = state["location"] = urljoin(self.upload_url, response.headers["Location"])
+            offset = 0
+        else:
+            async with self.client.head(location, headers=headers) as response:
+                if response.status != 200:
+                    self._check(response, await response.text())
+                offset = int(response.headers["Upload-Offset"])
+
+        source = opts.data
+        file = open(source, "rb") if isinstance(source, (str, os.PathLike)) else None
+        view = None if file else memoryview(source)
+        try:
+            while offset < size:
+                length = min(self.resumable_chunk_size, size - offset)
+                if file:
+                    file.seek(offset)
+                    chunk = file.read(length)
+                else:
+                    chunk = view[offset : offset + length]
+                patch_headers = {
+                    **headers,
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream",
+                }
+                async with self.client.patch(location, data=chunk, headers=patch_headers) as response:
+                    if response.status != 204:
+                        self._check(response, await response.text())
+                    offset = state["offset"] = int(response.headers["Upload-Offset"])
+        finally:
+            if file:
+                file.close()
+
+        file_id = location.rstrip("/").rsplit("/", 1)[-1]
+        async with self.client.get(
+            f"{self.api_url}/public/{file_id}", headers={"Authorization": f"Bearer {opts.token}"}
+        ) as response:
+            if response.status != 200:
+                self._check(response, await response.text())
+            data = await response.json()
+            return _file_metadata(data["data"])
+
+
+def _known_size(data) -> Optional[int]:
+    if isinstance(data, (str, os.PathLike)):
+        return os.path.getsize(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return memoryview(data).nbytes
+    return None
 
-                from alith.data.storage import FileMetadata
-                return FileMetadata(
-                    id=pinata_response.cid,
-                    name=pinata_response.name,
-                    size=pinata_response.size,
-                    modified_time=pinata_response.updated_at,
-                )
-        except aiohttp.ClientError as e:
-            raise StorageError(f"Network error: {str(e)}") from e
+
+async def _iter_view(view: memoryview, chunk_size: int):
+    view = view.cast("B")
+    for i in range(0, len(view), chunk_size):
+        yield view[i : i + chunk_size]
+
+
+def _file_metadata(data: dict):
+    # Use the actual response structure instead of the broken model
+    pinata_response = ActualPinataUploadResponse(**data)
+
+    from alith.data.storage import FileMetadata
+    return FileMetadata(
+        id=pinata_response.cid,
+        name=pinata_response.name,
+        size=pinata_response.size,
+        modified_time=pinata_response.updated_at,
+    )
 
 
 async def main():
     client = Client(private_key=getenv("PRIVATE_KEY"))
+    # Transactions are sent back to back with local nonces instead of one receipt at a time
+    txs = TxSubmitter(client.w3, client.wallet, client.config.chain_id)
     ipfs = CustomPinataIPFS()  # Use our custom implementation
+    dedup = DedupIndex()
+    # Steps after registration are journaled so a rerun does not pay for them twice
+    journal = Journal(getenv("DAT_JOURNAL", "dat_journal.jsonl"))
     try:
         # 1. Prepare your privacy data and encrypt it
         data_file_name = "my_personal_info.txt"
@@ -86,61 +267,107 @@ For me, tech isn’t just about code; it’s about creating something people can
 """
 
         file_hash = hashlib.sha256(privacy_data.encode()).hexdigest()
+        entry = dedup.get(file_hash)
+        if entry and entry.rewarded:
+            print(f"File ID: {entry.file_id} (already contributed, nothing to do)")
+            return
         encryption_seed = "Sign to retrieve your encryption key"
         message = encode_defunct(text=encryption_seed)
         password = client.wallet.sign_message(message).signature.hex()
-        encrypted_data = encrypt(privacy_data.encode(), password)
-        # 2. Upload the privacy data to IPFS and get the shared url
-        token = getenv("IPFS_JWT", "")
-        file_meta = await ipfs.upload(
-            UploadOptions(name=data_file_name, data=encrypted_data, token=token)
-        )
-        url = await ipfs.get_share_link(
-            GetShareLinkOptions(token=token, id=file_meta.id)
-        )
+        if entry:
+            # Same content as an earlier run: reuse its upload instead of a new CID
+            url = entry.url
+            print(f"Reusing upload {entry.cid}")
+        else:
+            encrypted_data = encrypt(privacy_data.encode(), password)
+            # 2. Upload the privacy data to IPFS and get the shared url
+            token = getenv("IPFS_JWT", "")
+            file_meta = await ipfs.upload(
+                UploadOptions(name=data_file_name, data=encrypted_data, token=token),
+                content_type="application/octet-stream",
+            )
+            url = await ipfs.get_share_link(
+                GetShareLinkOptions(token=token, id=file_meta.id)
+            )
+            dedup.record_upload(file_hash, data_file_name, file_meta.id, url)
         # 3. Upload the privacy url to LazAI
-        file_id = client.get_file_id_by_url(url)
+        registry = client.data_registry_contract
+        file_id = entry.file_id if entry and entry.file_id else client.get_file_id_by_url(url)
         if file_id == 0:
-            tx_hash = client.add_file_with_hash(url, file_hash)
-            print("Tx Hash:", tx_hash)
-            file_id = client.get_file_id_by_url(url)
+            receipt = await txs.transact(registry.functions.addFile(url, file_hash))
+            print("Tx Hash:", receipt["transactionHash"].hex())
+            file_id = first_indexed_uint(receipt, FILE_ADDED_TOPIC, registry.address)
+            if file_id is None:
+                file_id = client.get_file_id_by_url(url)
             print("File ID:", file_id)
         else:
             print(f"File ID: {file_id} (existing, no new transaction)")
+        dedup.record_file_id(file_hash, file_id)
         # 4. Request proof in the verified computing node
-        client.request_proof(file_id, 100)
-        job_id = client.file_job_ids(file_id)[-1]
-        job = client.get_job(job_id)
-        node_info = client.get_node(job[-1])
-        node_url: str = node_info[1]
-        pub_key = node_info[-1]
-        encryption_key = rsa.encrypt(
-            password.encode(),
-            rsa.PublicKey.load_pkcs1(pub_key.strip().encode(), format="PEM"),
-        ).hex()
-        response = requests.post(
-            f"{node_url}/proof",
-            json=ProofRequest(
-                job_id=job_id,
-                file_id=file_id,
-                file_url=url,
-                encryption_key=encryption_key,
-                encryption_seed=encryption_seed,
-                proof_url=None,
-            ).model_dump(),
-        )
-        if response.status_code == 200:
-            print("Proof request sent successfully")
-        else:
-            print("Failed to send proof request:", response.json())
+        request_reward = registry.functions.requestReward(file_id, 1)
+        reward_tx = None
+        job_id = journal.get(file_hash).get("job_id")
+        if job_id is None:
+            job_ids = client.file_job_ids(file_id)
+            if not job_ids:
+                verified_computing = client.verified_computing_contract
+                proof_tx = await txs.send(verified_computing.functions.requestProof(file_id), 100)
+                # The reward goes out right behind the proof request instead of
+                # after its receipt; its gas cannot be estimated before then
+                reward_tx = await txs.send(request_reward, gas=REWARD_GAS)
+                receipt = await txs.wait_receipt(proof_tx)
+                job_id = first_indexed_uint(receipt, JOB_SUBMITTED_TOPIC, verified_computing.address)
+                if job_id is None:
+                    job_id = client.file_job_ids(file_id)[-1]
+            else:
+                print(f"Reusing proof job {job_ids[-1]}")
+                job_id = job_ids[-1]
+            journal.record(file_hash, "proof_requested", file_id=file_id, job_id=job_id)
+        if not journal.done(file_hash, "proof_sent"):
+            job = client.get_job(job_id)
+            node_info = client.get_node(job[-1])
+            node_url: str = node_info[1]
+            pub_key = node_info[-1]
+            encryption_key = rsa.encrypt(
+                password.encode(),
+                rsa.PublicKey.load_pkcs1(pub_key.strip().encode(), format="PEM"),
+            ).hex()
+            response = requests.post(
+                f"{node_url}/proof",
+                json=ProofRequest(
+                    job_id=job_id,
+                    file_id=file_id,
+                    file_url=url,
+                    encryption_key=encryption_key,
+                    encryption_seed=encryption_seed,
+                    proof_url=None,
+                ).model_dump(),
+            )
+            if response.status_code == 200:
+                journal.record(file_hash, "proof_sent", node_url=node_url)
+                print("Proof request sent successfully")
+            else:
+                print("Failed to send proof request:", response.json())
         # 5. Request DAT reward
-        client.request_reward(file_id)
+        if reward_tx is not None:
+            try:
+                await txs.wait_receipt(reward_tx)
+            except RuntimeError:
+                # Reverted: send it again with its gas estimated now the proof is mined
+                reward_tx = None
+        if reward_tx is None:
+            await txs.transact(request_reward)
+        dedup.record_reward(file_hash)
+        journal.record(file_hash, "rewarded")
         print("Reward requested for file id", file_id)
     except StorageError as e:
         print(f"Error: {e}")
     except Exception as e:
         raise e
     finally:
+        journal.close()
+        dedup.close()
+        txs.close()
         await ipfs.close()
 
 
@@ -0,0 +1,1076 @@
+"""
+Query node and contribution benchmarks.
+
+Run without a chain, IPFS or Milvus: slow dependencies are replaced by local
+stand-ins with a configurable latency.
+
+    python benchmark.py concurrency --latency 0.05
+    python benchmark.py ingest --sizes 1 10 100
+    python benchmark.py memory --sizes 10 100
+    python benchmark.py keys --files 200
+    python benchmark.py encrypt --sizes 10 100
+    python benchmark.py upload --sizes 10 100 --fail-rate 0.2
+    python benchmark.py proofs --proofs 1000 --nodes 4
+    python benchmark.py reads --files 200
+    python benchmark.py journal --files 10000
+    python benchmark.py session --runs 5
+"""
+
+import argparse
+import asyncio
+import base64
+import functools
+import hashlib
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from chain import AsyncChain
+from ingest import (
+    IngestConfig,
+    StageTimer,
+    iter_chunks,
+    save_chunks,
+    stream_decrypt_url,
+)
+from crypto import SEGMENT_SIZE, decrypt_segments, encrypt_segments
+from ingest import decrypt_stream
+from journal import Journal
+from keys import ENCRYPTION_SEED, KeyMaterial
+
+WORDS = (
+    "privacy data query node web3 ai agent python django react tailwind "
+    "smart contract hackathon builder teaching students encryption vector "
+    "embedding milvus chain proof reward token collection"
+).split()
+
+
+class StandInClient:
+    """Mimics the blocking LazAI client RPCs used by the query node."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def get_file_id_by_url(self, url: str) -> int:
+        time.sleep(self.latency)
+        return 1
+
+    def get_file(self, file_id: int):
+        time.sleep(self.latency)
+        return [file_id, "0xowner", "https://ipfs.example/file", "hash"]
+
+    def get_file_permission(self, file_id: int, account: str):
+        time.sleep(self.latency)
+        return "0x00"
+
+
+async def _inline_lookup(client: StandInClient):
+    file_id = client.get_file_id_by_url("https://ipfs.example/file")
+    return client.get_file(file_id)
+
+
+async def _pooled_lookup(chain: AsyncChain):
+    file_id = await chain.get_file_id_by_url("https://ipfs.example/file")
+    return await chain.get_file(file_id)
+
+
+async def _throughput(make_request, in_flight: int, total: int) -> float:
+    semaphore = asyncio.Semaphore(in_flight)
+
+    async def one():
+        async with semaphore:
+            await make_request()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def bench_concurrency(args):
+    client = StandInClient(args.latency)
+    # No metadata cache: every request repeats the same lookup, which would
+    # otherwise be answered from the cache instead of overlapping RPCs
+    chain = AsyncChain(client, max_workers=args.workers, cache_size=0)
+    print(f"RPC latency {args.latency * 1000:.0f}ms, pool size {args.workers}")
+    print(f"{'in-flight':>10} {'inline req/s':>14} {'pooled req/s':>14}")
+    try:
+        for in_flight in args.in_flight:
+            total = max(args.requests, in_flight * 2)
+            inline = await _throughput(
+                lambda: _inline_lookup(client), in_flight, total
+            )
+            pooled = await _throughput(
+                lambda: _pooled_lookup(chain), in_flight, total
+            )
+            print(f"{in_flight:>10} {inline:>14.1f} {pooled:>14.1f}")
+    finally:
+        chain.close()
+
+
+class StandInEmbedding:
+    """Deterministic hash embedding, so the benchmark measures pipeline overhead."""
+
+    def __init__(self, dimension: int = 768):
+        self.dimension = dimension
+
+    def encode_documents(self, docs):
+        vectors = []
+        for doc in docs:
+            seed = hashlib.sha256(doc.encode("utf-8")).digest()
+            rng = random.Random(seed)
+            vectors.append([rng.random() for _ in range(self.dimension)])
+        return vectors
+
+
+class StandInMilvusClient:
+    def __init__(self):
+        self.rows = 0
+
+    def insert(self, collection_name, data):
+        self.rows += len(data)
+
+
+class StandInStore:
+    def __init__(self):
+        self.embedding_fn = StandInEmbedding()
+        self.client = StandInMilvusClient()
+
+
+def synthetic_text(megabytes: int, piece_size: int = 1024 * 1024):
+    """Yield `megabytes` of random sentences, one piece at a time."""
+    rng = random.Random(megabytes)
+    remaining = megabytes * 1024 * 1024
+    while remaining > 0:
+        sentences = []
+        size = 0
+        while size < min(piece_size, remaining):
+            sentence = " ".join(rng.choices(WORDS, k=rng.randint(6, 18))).capitalize() + "."
+            sentences.append(sentence)
+            size += len(sentence) + 1
+        piece = " ".join(sentences) + "\n"
+        remaining -= len(piece)
+        yield piece
+
+
+async def bench_ingest(args):
+    config = IngestConfig(
+        embed_batch_size=args.embed_batch, insert_batch_size=args.insert_batch
+    )
+    if args.milvus:
+        from alith import MilvusStore
+
+        store = MilvusStore()
+    print(f"embed batch {config.embed_batch_size}, insert batch {config.insert_batch_size}")
+    print(f"{'size':>6} {'chunks':>8} {'chunk s':>9} {'embed s':>9} {'insert s':>9} {'MB/s':>7} {'max RSS MB':>11}")
+    for megabytes in args.sizes:
+        if args.milvus:
+            collection_name = f"bench_{megabytes}mb_{int(time.time())}"
+            store.create_collection(collection_name=collection_name)
+        else:
+            store, collection_name = StandInStore(), "bench"
+        timer = StageTimer()
+        start = time.perf_counter()
+        count = save_chunks(
+            store, collection_name, iter_chunks(synthetic_text(megabytes), config, timer), config, timer
+        )
+        elapsed = time.perf_counter() - start
+        seconds = timer.seconds
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(
+            f"{megabytes:>4}MB {count:>8} {seconds.get('chunk', 0):>9.2f} "
+            f"{seconds.get('embed', 0):>9.2f} {seconds.get('insert', 0):>9.2f} "
+            f"{megabytes / elapsed:>7.2f} {max_rss:>11.1f}"
+        )
+        if args.milvus:
+            store.client.drop_collection(collection_name)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory: str):
+    """Serve a directory over HTTP as a local stand-in for the IPFS gateway."""
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def write_encrypted(path: str, megabytes: int, password: str):
+    """Write a gpg-encrypted synthetic document without holding it in memory."""
+    import gnupg
+
+    plain_path = path + ".txt"
+    with open(plain_path, "w", encoding="utf-8") as f:
+        for piece in synthetic_text(megabytes):
+            f.write(piece)
+    with open(plain_path, "rb") as f:
+        gnupg.GPG().encrypt_file(
+            f, None, passphrase=password, symmetric=True, armor=False, output=path
+        )
+    os.remove(plain_path)
+
+
+def _max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure_decrypt(mode: str, url: str, password: str, chunk: bool) -> tuple:
+    """Run one fetch/decrypt path in a fresh process and report its peak RSS."""
+    baseline = _max_rss_mb()
+    config = IngestConfig()
+    if mode == "whole":
+        # The original query node path: download, decrypt and decode in one go
+        from alith.data import decrypt, download_file
+
+        path = download_file(url)
+        with open(path, "rb") as f:
+            content = f.read()
+        os.remove(path)
+        texts = [decrypt(content, password=password).decode("utf-8")]
+    else:
+        texts = stream_decrypt_url(url, password, config.read_size)
+    if chunk:
+        count = sum(1 for _ in iter_chunks(texts, config))
+    else:
+        count = sum(len(text) for text in texts)
+    return baseline, _max_rss_mb(), count
+
+
+async def bench_memory(args):
+    password = "benchmark-password"
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        server, base_url = serve_directory(directory)
+        print(f"{'size':>6} {'mode':>7} {'baseline MB':>12} {'peak MB':>9} {'delta MB':>9} {'seconds':>8}")
+        try:
+            for megabytes in args.sizes:
+                name = f"doc_{megabytes}mb.enc"
+                write_encrypted(os.path.join(directory, name), megabytes, password)
+                for mode in args.modes:
+                    with context.Pool(1) as pool:
+                        start = time.perf_counter()
+                        baseline, peak, _ = pool.apply(
+                            measure_decrypt, (mode, f"{base_url}/{name}", password, args.chunk)
+                        )
+                        elapsed = time.perf_counter() - start
+                    print(
+                        f"{megabytes:>4}MB {mode:>7} {baseline:>12.1f} {peak:>9.1f} "
+                        f"{peak - baseline:>9.1f} {elapsed:>8.2f}"
+                    )
+                os.remove(os.path.join(directory, name))
+        finally:
+            server.shutdown()
+
+
+def _per_file_keys(wallet, pub_key: str) -> str:
+    """Key material for one file the way it was derived before KeyMaterial."""
+    import rsa
+    from eth_account.messages import encode_defunct
+
+    password = wallet.sign_message(encode_defunct(text=ENCRYPTION_SEED)).signature.hex()
+    return rsa.encrypt(
+        password.encode(), rsa.PublicKey.load_pkcs1(pub_key.strip().encode(), format="PEM")
+    ).hex()
+
+
+async def bench_keys(args):
+    import rsa
+    from alith.data import encrypt
+    from eth_account import Account
+
+    wallet = Account.create()
+    pub_keys = []
+    for _ in range(args.nodes):
+        public_key, _ = rsa.newkeys(args.rsa_bits)
+        pub_keys.append(public_key.save_pkcs1("PEM").decode())
+    print(f"{args.files} files over {args.nodes} node(s), {args.rsa_bits}-bit RSA")
+
+    start = time.perf_counter()
+    for i in range(args.files):
+        _per_file_keys(wallet, pub_keys[i % args.nodes])
+    before = (time.perf_counter() - start) / args.files
+
+    keys = KeyMaterial(wallet)
+    start = time.perf_counter()
+    for i in range(args.files):
+        keys.encryption_key(pub_keys[i % args.nodes])
+    after = (time.perf_counter() - start) / args.files
+
+    print(f"{'per file':>20} {'ms':>9}")
+    print(f"{'re-derived':>20} {before * 1000:>9.3f}")
+    print(f"{'KeyMaterial':>20} {after * 1000:>9.3f}")
+    if args.encrypt_kb:
+        data = os.urandom(args.encrypt_kb * 1024)
+        start = time.perf_counter()
+        for _ in range(min(args.files, 20)):
+            encrypt(data, keys.password)
+        elapsed = (time.perf_counter() - start) / min(args.files, 20)
+        print(f"{f'gpg {args.encrypt_kb}KB':>20} {elapsed * 1000:>9.3f}")
+
+
+def _pieces(data: bytes, size: int = 64 * 1024):
+    return (data[i : i + size] for i in range(0, len(data), size))
+
+
+async def bench_encrypt(args):
+    from alith.data import encrypt
+
+    password = "benchmark"
+    segment_size = args.segment_mb * 1024 * 1024
+    print(f"segment size {args.segment_mb}MB, {os.cpu_count()} CPU(s)")
+    print(f"{'size':>6} {'mode':>10} {'encrypt s':>10} {'decrypt s':>10} {'MB/s':>7}")
+    for megabytes in args.sizes:
+        data = "".join(synthetic_text(megabytes)).encode()
+        for mode in args.modes:
+            start = time.perf_counter()
+            if mode == "whole":
+                ciphertext = encrypt(data, password)
+            else:
+                ciphertext = b"".join(encrypt_segments(data, password, segment_size))
+            encrypted = time.perf_counter() - start
+            start = time.perf_counter()
+            if mode == "whole":
+                plaintext = b"".join(decrypt_stream(_pieces(ciphertext), password))
+            else:
+                plaintext = b"".join(decrypt_segments(_pieces(ciphertext), password))
+            decrypted = time.perf_counter() - start
+            assert plaintext == data
+            print(
+                f"{megabytes:>4}MB {mode:>10} {encrypted:>10.2f} {decrypted:>10.2f} "
+                f"{megabytes / encrypted:>7.1f}"
+            )
+
+
+class StandInPinata:
+    """Local aiohttp stand-in for Pinata's multipart and resumable (TUS) upload API.
+
+    Bodies are hashed as they stream in and never kept, and `fail_rate` of
+    the requests are answered with a 503 to exercise retries.
+    """
+
+    def __init__(self, fail_rate: float = 0.0):
+        self.fail_rate = fail_rate
+        self.uploads = {}
+        self.files = {}
+        self.requests = 0
+        self.failures = 0
+        self.random = random.Random(0)
+
+    def app(self):
+        from aiohttp import web
+
+        app = web.Application(client_max_size=1024**4)
+        app.router.add_post("/v3/files", self.create)
+        app.router.add_patch("/v3/files/{id}", self.patch)
+        app.router.add_head("/v3/files/{id}", self.head)
+        app.router.add_get("/api/v3/files/public/{id}", self.info)
+        return app
+
+    async def start(self):
+        from aiohttp import web
+
+        self.runner = web.AppRunner(self.app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    def _fail(self) -> bool:
+        self.requests += 1
+        if self.random.random() < self.fail_rate:
+            self.failures += 1
+            return True
+        return False
+
+    def _record(self, file_id: str, name: str, digest: str, size: int) -> dict:
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        record = {
+            "id": file_id, "name": name, "cid": f"bafy{digest[:52]}", "size": size,
+            "number_of_files": 1, "mime_type": "application/octet-stream",
+            "created_at": now, "updated_at": now, "network": "public", "streamable": False,
+        }
+        self.files[file_id] = {**record, "sha256": digest}
+        return record
+
+    async def create(self, request):
+        from aiohttp import web
+
+        if self._fail():
+            return web.Response(status=503, text="Service unavailable")
+        file_id = f"file{len(self.files) + len(self.uploads)}"
+        if "Tus-Resumable" in request.headers:
+            metadata = dict(
+                item.split(" ", 1) for item in request.headers["Upload-Metadata"].split(",")
+            )
+            self.uploads[file_id] = {
+                "name": base64.b64decode(metadata["filename"]).decode(),
+                "length": int(request.headers["Upload-Length"]),
+                "offset": 0,
+                "hash": hashlib.sha256(),
+            }
+            return web.Response(status=201, headers={"Location": f"/v3/files/{file_id}"})
+        reader = await request.multipart()
+        digest, size, name = hashlib.sha256(), 0, "upload"
+        async for part in reader:
+            if part.name == "file":
+                name = part.filename
+                while chunk := await part.read_chunk(256 * 1024):
+                    digest.update(chunk)
+                    size += len(chunk)
+        return web.json_response({"data": self._record(file_id, name, digest.hexdigest(), size)})
+
+    async def patch(self, request):
+        from aiohttp import web
+
+        upload = self.uploads[request.match_info["id"]]
+        if int(request.headers["Upload-Offset"]) != upload["offset"]:
+            return web.Response(status=409, text="Offset mismatch")
+        if self._fail():
+            # Drop the connection part way through, as a flaky network would
+            await request.content.read(64 * 1024)
+            return web.Response(status=503, text="Service unavailable")
+        async for chunk in request.content.iter_chunked(256 * 1024):
+            upload["hash"].update(chunk)
+            upload["offset"] += len(chunk)
+        if upload["offset"] == upload["length"]:
+            file_id = request.match_info["id"]
+            self._record(file_id, upload["name"], upload["hash"].hexdigest(), upload["length"])
+        return web.Response(status=204, headers={"Upload-Offset": str(upload["offset"])})
+
+    async def head(self, request):
+        from aiohttp import web
+
+        upload = self.uploads[request.match_info["id"]]
+        return web.Response(headers={"Upload-Offset": str(upload["offset"])})
+
+    async def info(self, request):
+        from aiohttp import web
+
+        record = dict(self.files[request.match_info["id"]])
+        record.pop("sha256")
+        return web.json_response({"data": record})
+
+
+def measure_upload(mode: str, base_url: str, path: str, chunk_mb: int) -> tuple:
+    """Upload `path` one way in a fresh process and report its peak RSS."""
+    import mmap
+
+    from Dat import CustomPinataIPFS
+    from alith.data.storage import UploadOptions
+
+    async def run():
+        ipfs = CustomPinataIPFS(
+            upload_url=f"{base_url}/v3/files",
+            api_url=f"{base_url}/api/v3/files",
+            retries=5,
+            backoff=0.05,
+            resumable_threshold=0 if mode == "resumable" else None,
+            resumable_chunk_size=chunk_mb * 1024 * 1024,
+        )
+        try:
+            if mode == "bytes":
+                # The previous behaviour: the whole payload read into memory first
+                with open(path, "rb") as f:
+                    data = f.read()
+            elif mode == "memoryview":
+                f = open(path, "rb")
+                data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            elif mode == "iterator":
+                async def read_file():
+                    with open(path, "rb") as f:
+                        while chunk := f.read(256 * 1024):
+                            yield chunk
+
+                data = read_file
+            else:
+                data = path
+            return await ipfs.upload(
+                UploadOptions(name=os.path.basename(path), data=data, token="stand-in"),
+                content_type="application/octet-stream",
+            )
+        finally:
+            await ipfs.close()
+
+    baseline = _max_rss_mb()
+    meta = asyncio.run(run())
+    return baseline, _max_rss_mb(), meta.id
+
+
+async def bench_upload(args):
+    pinata = StandInPinata(args.fail_rate)
+    base_url = await pinata.start()
+    context = multiprocessing.get_context("spawn")
+    loop = asyncio.get_running_loop()
+    print(f"fail rate {args.fail_rate}, resumable chunk {args.chunk_mb}MB")
+    print(f"{'size':>6} {'mode':>11} {'baseline MB':>12} {'peak MB':>9} {'delta MB':>9} {'MB/s':>7} {'ok':>3}")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for megabytes in args.sizes:
+                path = os.path.join(directory, f"upload_{megabytes}mb.bin")
+                digest = hashlib.sha256()
+                with open(path, "wb") as f:
+                    for _ in range(megabytes):
+                        block = os.urandom(1024 * 1024)
+                        digest.update(block)
+                        f.write(block)
+                for mode in args.modes:
+                    with context.Pool(1) as pool:
+                        start = time.perf_counter()
+                        baseline, peak, cid = await loop.run_in_executor(
+                            None, pool.apply, measure_upload, (mode, base_url, path, args.chunk_mb)
+                        )
+                        elapsed = time.perf_counter() - start
+                    ok = any(
+                        f["cid"] == cid and f["sha256"] == digest.hexdigest()
+                        for f in pinata.files.values()
+                    )
+                    print(
+                        f"{megabytes:>4}MB {mode:>11} {baseline:>12.1f} {peak:>9.1f} "
+                        f"{peak - baseline:>9.1f} {megabytes / elapsed:>7.1f} {'yes' if ok else 'NO':>3}"
+                    )
+                os.remove(path)
+    finally:
+        await pinata.stop()
+    print(f"{pinata.failures}/{pinata.requests} requests failed and were retried")
+
+
+class StandInProofNode:
+    """Local aiohttp stand-in for a verified computing node's /proof endpoint."""
+
+    def __init__(self, latency: float = 0.02, fail_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.received = set()
+        self.requests = 0
+        self.failures = 0
+        self.connections = set()
+
+    async def proof(self, request):
+        from aiohttp import web
+
+        self.requests += 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        body = await request.json()
+        await asyncio.sleep(self.latency)
+        if self.random.random() < self.fail_rate:
+            self.failures += 1
+            return web.Response(status=503, text="Busy")
+        self.received.add(body["job_id"])
+        return web.json_response({"status": "ok"})
+
+    async def start(self) -> str:
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_post("/proof", self.proof)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        return f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def _blocking_proofs(client, keys: KeyMaterial, total: int):
+    """The original script path: chain lookups and a fresh connection per proof."""
+    import requests
+    from alith.lazai import ProofRequest
+
+    for job_id in range(total):
+        job = client.get_job(job_id)
+        node_info = client.get_node(job[-1])
+        requests.post(
+            f"{node_info[1]}/proof",
+            json=ProofRequest(
+                job_id=job_id, file_id=job_id, file_url="https://ipfs.example/file",
+                encryption_key=keys.encryption_key(node_info[-1]),
+                encryption_seed=ENCRYPTION_SEED, proof_url=None,
+            ).model_dump(),
+        )
+
+
+async def bench_proofs(args):
+    import rsa
+    from eth_account import Account
+
+    from proofs import ProofDispatcher
+    from reads import ChainReader, cache_chain_id
+
+    public_key, _ = rsa.newkeys(2048)
+    keys = KeyMaterial(Account.create())
+    loop = asyncio.get_running_loop()
+    print(
+        f"{args.proofs} proofs over {args.nodes} node(s), node latency "
+        f"{args.latency * 1000:.0f}ms, RPC latency {args.rpc_latency * 1000:.0f}ms, fail rate {args.fail_rate}"
+    )
+    print(f"{'mode':>10} {'seconds':>8} {'proofs/s':>9} {'delivered':>10} {'connections':>12} {'RPCs':>6} {'retried':>8}")
+    for mode in args.modes:
+        nodes = [StandInProofNode(args.latency, args.fail_rate, seed=i) for i in range(args.nodes)]
+        urls = [await node.start() for node in nodes]
+        chain = StandInChain(
+            args.rpc_latency, args.nodes, node_urls=urls, pub_key=public_key.save_pkcs1("PEM").decode()
+        )
+        chain.start()
+        client = chain.client()
+        total = args.proofs if mode == "dispatcher" else min(args.proofs, args.sequential)
+        start = time.perf_counter()
+        if mode == "sequential":
+            await loop.run_in_executor(None, _blocking_proofs, client, keys, total)
+        else:
+            executor = ThreadPoolExecutor(max_workers=8)
+            cache_chain_id(client.w3)
+            dispatcher = ProofDispatcher(
+                ChainReader(client), keys, ENCRYPTION_SEED, executor,
+                per_node=args.per_node, backoff=0.05, retries=5,
+            )
+            statuses = await dispatcher.dispatch_many(
+                (job_id, job_id, "https://ipfs.example/file") for job_id in range(total)
+            )
+            await dispatcher.close()
+            executor.shutdown()
+            failed = [s for s in statuses if s.state == "failed"]
+            if failed:
+                print(f"{len(failed)} proofs failed, first error: {failed[0].error}")
+        elapsed = time.perf_counter() - start
+        delivered = sum(len(node.received) for node in nodes)
+        connections = sum(len(node.connections) for node in nodes)
+        retried = sum(node.failures for node in nodes)
+        print(
+            f"{mode:>10} {elapsed:>8.2f} {total / elapsed:>9.1f} {delivered:>10} "
+            f"{connections:>12} {chain.http_requests:>6} {retried:>8}"
+        )
+        chain.stop()
+        for node in nodes:
+            await node.stop()
+
+
+class StandInChain:
+    """Local JSON-RPC stand-in answering the LazAI view calls used here.
+
+    Each HTTP request (a single call or a whole batch) costs `latency`
+    seconds. Users outside `users` revert `getUser` like an unregistered
+    wallet does on the real chain.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.02,
+        nodes: int = 4,
+        batching: bool = True,
+        node_urls=None,
+        pub_key: str = "-----BEGIN RSA PUBLIC KEY-----\nstand-in\n-----END RSA PUBLIC KEY-----",
+    ):
+        import json
+
+        from eth_account import Account
+
+        self.json = json
+        self.latency = latency
+        self.node_addresses = [Account.create().address for _ in range(nodes)]
+        self.node_urls = {
+            address.lower(): url for address, url in zip(self.node_addresses, node_urls or [])
+        }
+        self.pub_key = pub_key
+        self.users = set()
+        self.batching = batching
+        self.http_requests = 0
+        self.calls = 0
+        self.functions = {}
+
+    def client(self):
+        """A real `alith.lazai.Client` pointed at this stand-in, after `start`."""
+        from alith.lazai import Client
+        from alith.lazai.chain import ChainConfig
+        from eth_account import Account
+        from eth_utils import function_abi_to_4byte_selector
+
+        client = Client(
+            chain_config=ChainConfig("local", self.url, 133718),
+            private_key=Account.create().key.hex(),
+        )
+        for contract in (
+            client.verified_computing_contract,
+            client.inference_contract,
+            client.query_contract,
+            client.settlement_contract,
+        ):
+            for abi in contract.abi:
+                if abi.get("type") == "function":
+                    selector = function_abi_to_4byte_selector(abi)
+                    self.functions[(contract.address.lower(), selector)] = abi
+        return client
+
+    def _result(self, abi, args):
+        name = abi["name"]
+        if name == "fileJobIds":
+            return [[args[0] * 10, args[0] * 10 + 1]]
+        if name == "getJob":
+            node = self.node_addresses[args[0] % len(self.node_addresses)]
+            return [(args[0] // 10, 100, 1, 0, self.node_addresses[0], node)]
+        if name == "getNode":
+            url = self.node_urls.get(args[0].lower(), f"http://node-{args[0][-6:].lower()}.example")
+            return [(args[0], url, 1, 0, 0, self.pub_key)]
+        if name == "getUser":
+            if args[0].lower() not in self.users:
+                raise ValueError("execution reverted")
+            return [(args[0], 1000, 1000, [], [], [])]
+        if name == "getAccount":
+            return [(args[0], args[1], 0, 1000, 0, [])]
+        raise ValueError(f"{name} is not served by the stand-in chain")
+
+    def _answer(self, request: dict) -> dict:
+        from eth_abi import decode, encode
+        from eth_utils import get_abi_input_types, get_abi_output_types
+
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        if request["method"] == "eth_chainId":
+            return {**response, "result": hex(133718)}
+        if request["method"] != "eth_call":
+            return {**response, "error": {"code": -32601, "message": "Method not found"}}
+        self.calls += 1
+        call = request["params"][0]
+        data = bytes.fromhex(call.get("data", call.get("input", ""))[2:])
+        abi = self.functions[(call["to"].lower(), data[:4])]
+        args = decode(get_abi_input_types(abi), data[4:])
+        try:
+            values = self._result(abi, args)
+        except ValueError as e:
+            return {**response, "error": {"code": 3, "message": str(e), "data": "0x"}}
+        return {**response, "result": "0x" + encode(get_abi_output_types(abi), values).hex()}
+
+    def start(self):
+        chain = self
+
+        class Handler(QuietHandler):
+            def do_POST(self):
+                body = chain.json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                chain.http_requests += 1
+                time.sleep(chain.latency)
+                if isinstance(body, list):
+                    if chain.batching:
+                        answer = [chain._answer(request) for request in body]
+                    else:
+                        answer = {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Batch requests are not supported"}}
+                else:
+                    answer = chain._answer(body)
+                payload = chain.json.dumps(answer).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def _sequential_resolution(client, file_ids):
+    """The original per-file path: fileJobIds, getJob and getNode one after another."""
+    resolved = {}
+    for file_id in file_ids:
+        job_id = client.file_job_ids(file_id)[-1]
+        job = client.get_job(job_id)
+        resolved[file_id] = (job_id, client.get_node(job[-1]))
+    return resolved
+
+
+async def bench_reads(args):
+    from reads import ChainReader, cache_chain_id
+
+    chain = StandInChain(args.latency, args.nodes, batching=not args.no_batch)
+    chain.start()
+    client = chain.client()
+    user, node = client.wallet.address, chain.node_addresses[0]
+    chain.users.add(user.lower())
+    file_ids = list(range(1, args.files + 1))
+    print(f"{args.files} files, {args.nodes} nodes, {args.latency * 1000:.0f}ms per HTTP request")
+    print(f"{'operation':>28} {'HTTP requests':>14} {'calls':>6} {'seconds':>8}")
+
+    def report(name, fn):
+        before_requests, before_calls = chain.http_requests, chain.calls
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>28} {chain.http_requests - before_requests:>14} "
+            f"{chain.calls - before_calls:>6} {elapsed:>8.2f}"
+        )
+        return result
+
+    try:
+        # Baselines first: the reader runs with chain id caching turned on in the provider
+        expected = report("sequential job->node", lambda: _sequential_resolution(client, file_ids))
+        report(
+            "sequential user/node/account",
+            lambda: (
+                client.get_user(user),
+                client.get_inference_node(node),
+                client.get_inference_account(user, node),
+            ),
+        )
+        cache_chain_id(client.w3)
+        reader = ChainReader(client)
+        batched = report("ChainReader job->node", lambda: reader.nodes_for_files(file_ids))
+        assert {k: (j, list(n)) for k, (j, n) in batched.items()} == {
+            k: (j, list(n)) for k, (j, n) in expected.items()
+        }
+        report("  again, nodes cached", lambda: reader.nodes_for_files(file_ids))
+        report("ChainReader settlement", lambda: ChainReader(client).settlement(user, node))
+        reader.settlement(user, node)
+        report("  again, node cached", lambda: reader.settlement(user, node))
+
+        async def concurrent_views():
+            contract = client.verified_computing_contract
+            return await asyncio.gather(
+                *(reader.view(contract.functions.getJob(file_id * 10)) for file_id in file_ids)
+            )
+
+        # Many coroutines each reading one job, as concurrent proofs or queries do
+        before_requests, before_calls = chain.http_requests, chain.calls
+        start = time.perf_counter()
+        await concurrent_views()
+        print(
+            f"{'coalesced concurrent getJob':>28} {chain.http_requests - before_requests:>14} "
+            f"{chain.calls - before_calls:>6} {time.perf_counter() - start:>8.2f}"
+        )
+        print(f"reader stats: {reader.stats()}")
+    finally:
+        chain.stop()
+
+JOURNAL_STEPS = [
+    ("uploaded", lambda i: {"name": f"record_{i}.txt", "url": f"https://ipfs.example/{i}", "cid": f"cid{i}"}),
+    ("register_broadcast", lambda i: {"register_tx": "0x" + hashlib.sha256(b"r%d" % i).hexdigest()}),
+    ("registered", lambda i: {"file_id": i}),
+    ("proof_broadcast", lambda i: {"proof_tx": "0x" + hashlib.sha256(b"p%d" % i).hexdigest()}),
+    ("proof_requested", lambda i: {"job_id": i * 10}),
+    ("proof_sent", lambda i: {"node_url": "http://node.example"}),
+    ("reward_broadcast", lambda i: {"reward_tx": "0x" + hashlib.sha256(b"w%d" % i).hexdigest()}),
+    ("rewarded", lambda i: {}),
+]
+BULK_STEPS = ["uploaded", "registered", "proof_requested", "proof_sent", "rewarded"]
+
+
+def _resume_plan(journal: Journal, keys) -> dict:
+    """What a restarted bulk run would still do for each file."""
+    return {
+        key: [step for step in BULK_STEPS if not journal.done(key, step)] for key in keys
+    }
+
+
+async def bench_journal(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "journal.jsonl")
+        for fsync in (False, True):
+            journal = Journal(path, fsync=fsync)
+            start = time.perf_counter()
+            for i in range(args.records):
+                journal.record(f"throughput{i}", "uploaded", url=f"https://ipfs.example/{i}")
+            elapsed = time.perf_counter() - start
+            journal.close()
+            os.remove(path)
+            print(f"record, fsync={fsync}: {args.records / elapsed:,.0f} steps/s")
+
+        # A batch interrupted at a random step of every file
+        random.seed(0)
+        keys = [hashlib.sha256(b"%d" % i).hexdigest() for i in range(args.files)]
+        journal = Journal(path, fsync=False)
+        for i, key in enumerate(keys):
+            for step, fields in JOURNAL_STEPS[: random.randint(0, len(JOURNAL_STEPS))]:
+                journal.record(key, step, **fields(i))
+        journal.close()
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{args.files} files, {size_mb:.1f} MB journal")
+
+        def recover(name, compact_ratio):
+            start = time.perf_counter()
+            journal = Journal(path, compact_ratio=compact_ratio)
+            plan = _resume_plan(journal, keys)
+            elapsed = time.perf_counter() - start
+            journal.close()
+            remaining = sum(len(steps) for steps in plan.values())
+            print(
+                f"{name:>26}: {elapsed:.3f}s, {remaining} steps left, "
+                f"{os.path.getsize(path) / 1e6:.1f} MB on disk"
+            )
+            return plan
+
+        expected = recover("replay full log", 0)
+        assert recover("replay + compact", args.compact_ratio) == expected
+        assert recover("load snapshot", args.compact_ratio) == expected
+
+
+def _uncached_startup(client, node):
+    """The chain work `new.py` and `inference.py` did before their first prompt."""
+    client.get_user(client.wallet.address)
+    client.get_user(client.wallet.address)
+    url = client.get_inference_node(node)[1]
+    client.get_inference_account(client.wallet.address, node)
+    return url
+
+
+async def bench_session(args):
+    import sys
+
+    from alith.lazai import Client
+
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from session import bootstrap
+
+    chain = StandInChain(args.latency, 1)
+    chain.start()
+    node = chain.node_addresses[0]
+    print(f"{args.runs} script starts, {args.latency * 1000:.0f}ms per HTTP request")
+    print(f"{'startup':>22} {'HTTP requests':>14} {'seconds':>8}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "session.json")
+            for name, start_up in (
+                ("uncached", _uncached_startup),
+                ("bootstrap", lambda client, node: bootstrap(client, node, path=path).url),
+            ):
+                # A fresh client per run, as every script start builds one
+                client = chain.client()
+                chain.users.add(client.wallet.address.lower())
+                for run in range(args.runs):
+                    client = Client(chain_config=client.config, private_key=client.wallet.key.hex())
+                    before = chain.http_requests
+                    start = time.perf_counter()
+                    start_up(client, node)
+                    elapsed = time.perf_counter() - start
+                    label = f"{name} #{run + 1}"
+                    print(f"{label:>22} {chain.http_requests - before:>14} {elapsed:>8.3f}")
+    finally:
+        chain.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query node and contribution benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    concurrency = subparsers.add_parser(
+        "concurrency", help="Throughput of /query/rag chain lookups vs in-flight requests"
+    )
+    concurrency.add_argument("--latency", type=float, default=0.05, help="Seconds per RPC")
+    concurrency.add_argument("--workers", type=int, default=32, help="Chain thread pool size")
+    concurrency.add_argument("--requests", type=int, default=64, help="Requests per level")
+    concurrency.add_argument(
+        "--in-flight", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64]
+    )
+    concurrency.set_defaults(func=bench_concurrency)
+
+    ingest = subparsers.add_parser(
+        "ingest", help="Chunk/embed/insert timings for synthetic documents"
+    )
+    ingest.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="Document sizes in MB")
+    ingest.add_argument("--embed-batch", type=int, default=IngestConfig.embed_batch_size)
+    ingest.add_argument("--insert-batch", type=int, default=IngestConfig.insert_batch_size)
+    ingest.add_argument(
+        "--milvus", action="store_true", help="Use the real MilvusStore instead of a stand-in"
+    )
+    ingest.set_defaults(func=bench_ingest)
+
+    memory = subparsers.add_parser(
+        "memory", help="Peak RSS of whole-file vs streaming fetch/decrypt from a local HTTP server"
+    )
+    memory.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="Document sizes in MB")
+    memory.add_argument("--modes", nargs="+", choices=["whole", "stream"], default=["whole", "stream"])
+    memory.add_argument("--chunk", action="store_true", help="Also run the chunker over the text")
+    memory.set_defaults(func=bench_memory)
+
+    keys = subparsers.add_parser(
+        "keys", help="Per-file key derivation cost, re-derived vs cached KeyMaterial"
+    )
+    keys.add_argument("--files", type=int, default=200)
+    keys.add_argument("--nodes", type=int, default=1, help="Distinct computing node keys")
+    keys.add_argument("--rsa-bits", type=int, default=3072, help="Node RSA key size")
+    keys.add_argument(
+        "--encrypt-kb", type=int, default=0, help="Also time gpg encryption of a file this size"
+    )
+    keys.set_defaults(func=bench_keys)
+
+    encrypt = subparsers.add_parser(
+        "encrypt", help="Whole-file gpg vs parallel segmented encryption and decryption"
+    )
+    encrypt.add_argument("--sizes", type=int, nargs="+", default=[10, 100], help="Document sizes in MB")
+    encrypt.add_argument("--segment-mb", type=int, default=SEGMENT_SIZE // (1024 * 1024))
+    encrypt.add_argument("--modes", nargs="+", choices=["whole", "segmented"], default=["whole", "segmented"])
+    encrypt.set_defaults(func=bench_encrypt)
+
+    upload = subparsers.add_parser(
+        "upload", help="Peak RSS and throughput of Pinata uploads against a local stand-in"
+    )
+    upload.add_argument("--sizes", type=int, nargs="+", default=[10, 100], help="File sizes in MB")
+    upload.add_argument(
+        "--modes",
+        nargs="+",
+        choices=["bytes", "path", "memoryview", "iterator", "resumable"],
+        default=["bytes", "path", "memoryview", "iterator", "resumable"],
+    )
+    upload.add_argument("--chunk-mb", type=int, default=8, help="Resumable upload chunk size")
+    upload.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    upload.set_defaults(func=bench_upload)
+
+    proofs = subparsers.add_parser(
+        "proofs", help="Sequential blocking proof requests vs the pooled ProofDispatcher"
+    )
+    proofs.add_argument("--proofs", type=int, default=1000)
+    proofs.add_argument("--nodes", type=int, default=4, help="Stand-in computing nodes")
+    proofs.add_argument("--latency", type=float, default=0.02, help="Seconds per proof request at the node")
+    proofs.add_argument("--rpc-latency", type=float, default=0.01, help="Seconds per chain RPC")
+    proofs.add_argument("--per-node", type=int, default=16, help="Dispatcher connections per node")
+    proofs.add_argument("--fail-rate", type=float, default=0.0, help="Share of proofs answered with 503")
+    proofs.add_argument("--sequential", type=int, default=100, help="Proofs sent in sequential mode")
+    proofs.add_argument("--modes", nargs="+", choices=["sequential", "dispatcher"], default=["sequential", "dispatcher"])
+    proofs.set_defaults(func=bench_proofs)
+
+    reads = subparsers.add_parser(
+        "reads", help="RPC round trips of sequential chain reads vs the batched ChainReader"
+    )
+    reads.add_argument("--files", type=int, default=200)
+    reads.add_argument("--nodes", type=int, default=4, help="Distinct computing nodes")
+    reads.add_argument("--latency", type=float, default=0.02, help="Seconds per HTTP request")
+    reads.add_argument("--no-batch", action="store_true", help="Stand-in rejects JSON-RPC batches")
+    reads.set_defaults(func=bench_reads)
+
+    journal = subparsers.add_parser(
+        "journal", help="Journal write throughput and recovery time of an interrupted bulk run"
+    )
+    journal.add_argument("--files", type=int, default=10000)
+    journal.add_argument("--records", type=int, default=2000, help="Steps written per throughput run")
+    journal.add_argument("--compact-ratio", type=float, default=2.0, help="Lines per file that trigger compaction")
+    journal.set_defaults(func=bench_journal)
+
+    session = subparsers.add_parser(
+        "session", help="Chain round trips before the first prompt, uncached vs session.bootstrap"
+    )
+    session.add_argument("--runs", type=int, default=5, help="Script starts per mode")
+    session.add_argument("--latency", type=float, default=0.05, help="Seconds per HTTP request")
+    session.set_defaults(func=bench_session)
+
+    args = parser.parse_args()
+    asyncio.run(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
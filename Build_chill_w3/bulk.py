@@ -0,0 +1,331 @@
+"""
+Bulk DAT contribution: encrypt, upload and register many privacy data files.
+
+    python bulk.py --input ./my_data            # one record per file
+    python bulk.py --input records.jsonl        # {"name": ..., "data": ...} per line
+    python bulk.py --input ./big --segment-mb 4 # segmented encryption for large files
+
+Uploads run concurrently over one shared aiohttp session and chain
+transactions are pipelined with locally assigned nonces, so files do not
+wait on each other's receipts. Proof requests go to the computing nodes
+over pooled keep-alive sessions (`proofs.ProofDispatcher`), and the jobs
+sent are polled for up to `--proof-wait` seconds until the nodes have
+submitted their proofs. Progress is journaled per file, including the hash
+of every transaction before its receipt arrives; re-running the same
+command resumes where it stopped without re-uploading or re-sending
+anything that already went out.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from alith.data import encrypt
+from alith.data.storage import GetShareLinkOptions, UploadOptions
+from alith.lazai import Client
+from dotenv import load_dotenv
+from web3 import Web3
+
+from chain import AsyncChain
+from crypto import aencrypt_segments
+from Dat import CustomPinataIPFS
+from dedup import DEDUP_PATH, DedupIndex
+from journal import Journal
+from keys import ENCRYPTION_SEED, KeyMaterial
+from proofs import ProofDispatcher
+from reads import ChainReader, cache_chain_id
+from txpool import (
+    FILE_ADDED_TOPIC,
+    JOB_SUBMITTED_TOPIC,
+    REWARD_GAS,
+    TxSubmitter,
+    first_indexed_uint,
+)
+
+load_dotenv()
+
+PROOF_VALUE = 100
+
+
+def read_records(path: Path):
+    """Yield (name, text) pairs from a directory of files or a JSONL file."""
+    if path.is_dir():
+        for file in sorted(p for p in path.iterdir() if p.is_file()):
+            yield file.name, file.read_text(encoding="utf-8")
+    else:
+        with path.open("r", encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                if line.strip():
+                    record = json.loads(line)
+                    yield record.get("name", f"record_{i}.txt"), record["data"]
+
+
+class BulkContributor:
+    def __init__(
+        self,
+        client: Client,
+        ipfs: CustomPinataIPFS,
+        journal: Journal,
+        dedup: DedupIndex,
+        concurrency: int,
+        segment_size: int = 0,
+    ):
+        self.client = client
+        self.ipfs = ipfs
+        self.journal = journal
+        self.dedup = dedup
+        self.token = os.getenv("IPFS_JWT", "")
+        self.uploads = asyncio.Semaphore(concurrency)
+        self.workers = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="encrypt")
+        self.reads = AsyncChain(client, max_workers=concurrency)
+        self.txs = TxSubmitter(client.w3, client.wallet, client.config.chain_id)
+        self.keys = KeyMaterial(client.wallet)
+        cache_chain_id(client.w3)
+        self.reader = ChainReader(client)
+        self.proofs = ProofDispatcher(self.reader, self.keys, ENCRYPTION_SEED, self.reads.executor)
+        self.segment_size = segment_size
+        self.seen = set()
+
+    async def _run(self, executor, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+
+    async def chain(self, fn, *args, **kwargs):
+        return await self.reads.run(fn, *args, **kwargs)
+
+    async def upload(self, key: str, name: str, text: str):
+        async with self.uploads:
+            data = text.encode()
+            if self.segment_size and len(data) > self.segment_size:
+                # Segments are encrypted in parallel; only readers that understand
+                # the segmented format (this repo's query node) can decrypt them
+                # Frames stream into the upload body as they are encrypted; a
+                # retried upload re-encrypts from the start
+                encrypted_data = partial(
+                    aencrypt_segments, data, self.keys.password, self.segment_size, self.workers
+                )
+            else:
+                encrypted_data = await self._run(
+                    self.workers, encrypt, data, self.keys.password
+                )
+            file_meta = await self.ipfs.upload(
+                UploadOptions(name=name, data=encrypted_data, token=self.token),
+                content_type="application/octet-stream",
+            )
+            url = await self.ipfs.get_share_link(
+                GetShareLinkOptions(token=self.token, id=file_meta.id)
+            )
+        self.dedup.record_upload(key, name, file_meta.id, url)
+        self.journal.record(key, "uploaded", name=name, url=url, cid=file_meta.id)
+
+    async def broadcast_once(self, key: str, step: str, function, value: int = 0, gas=None) -> str:
+        """Broadcast the transaction behind `step` unless a run already did, returning its hash.
+
+        The hash is journaled before anything waits on the receipt, so a run
+        that crashed in between waits for that transaction instead of paying
+        for another one.
+        """
+        tx_hash = self.journal.get(key).get(f"{step}_tx")
+        if tx_hash is None:
+            tx_hash = Web3.to_hex(await self.txs.send(function, value, gas))
+            self.journal.record(key, f"{step}_broadcast", **{f"{step}_tx": tx_hash})
+        return tx_hash
+
+    async def transact_once(self, key: str, step: str, function, value: int = 0):
+        """Send the transaction behind `step` at most once across restarts and wait for it.
+
+        One that was dropped from the mempool or reverted is sent again.
+        """
+        try:
+            receipt = await self.txs.resume(await self.broadcast_once(key, step, function, value))
+        except RuntimeError:
+            receipt = None
+        if receipt is not None:
+            return receipt
+        tx_hash = await self.txs.send(function, value)
+        self.journal.record(key, f"{step}_broadcast", **{f"{step}_tx": Web3.to_hex(tx_hash)})
+        return await self.txs.wait_receipt(tx_hash)
+
+    async def register(self, key: str):
+        state = self.journal.get(key)
+        file_id = await self.chain(self.client.get_file_id_by_url, state["url"])
+        if file_id == 0:
+            registry = self.client.data_registry_contract
+            receipt = await self.transact_once(
+                key, "register", registry.functions.addFile(state["url"], key)
+            )
+            file_id = first_indexed_uint(receipt, FILE_ADDED_TOPIC, registry.address)
+            if file_id is None:
+                file_id = await self.chain(self.client.get_file_id_by_url, state["url"])
+        self.dedup.record_file_id(key, file_id)
+        self.journal.record(key, "registered", file_id=file_id)
+
+    async def request_proof(self, key: str):
+        state = self.journal.get(key)
+        file_id = state["file_id"]
+        verified_computing = self.client.verified_computing_contract
+        job_ids = []
+        if "proof_tx" not in state:
+            # A proof requested before this file was journaled (another journal,
+            # or a crash before the hash was written) is reused, not paid twice
+            job_ids = await self.reader.view(
+                verified_computing.functions.fileJobIds(file_id), self.reads.executor
+            )
+        if job_ids:
+            job_id = job_ids[-1]
+        else:
+            request_proof = verified_computing.functions.requestProof(file_id)
+            await self.broadcast_once(key, "proof", request_proof, PROOF_VALUE)
+            # The reward goes out right behind the proof request instead of after
+            # its receipt; a reverted one is sent again by request_reward
+            await self.broadcast_once(
+                key,
+                "reward",
+                self.client.data_registry_contract.functions.requestReward(file_id, 1),
+                gas=REWARD_GAS,
+            )
+            receipt = await self.transact_once(key, "proof", request_proof, PROOF_VALUE)
+            job_id = first_indexed_uint(receipt, JOB_SUBMITTED_TOPIC, verified_computing.address)
+            if job_id is None:
+                job_id = (await self.chain(self.client.file_job_ids, file_id))[-1]
+        self.journal.record(key, "proof_requested", job_id=job_id)
+
+    async def send_proof(self, key: str):
+        state = self.journal.get(key)
+        status = await self.proofs.dispatch(state["job_id"], state["file_id"], state["url"])
+        if status.state == "failed":
+            raise RuntimeError(status.error)
+        self.journal.record(key, "proof_sent", node_url=status.node_url)
+
+    async def request_reward(self, key: str):
+        file_id = self.journal.get(key)["file_id"]
+        await self.transact_once(
+            key, "reward", self.client.data_registry_contract.functions.requestReward(file_id, 1)
+        )
+        self.dedup.record_reward(key)
+        self.journal.record(key, "rewarded")
+
+    async def contribute(self, name: str, text: str) -> bool:
+        key = hashlib.sha256(text.encode()).hexdigest()
+        if key in self.seen:
+            print(f"⏭️  {name}: duplicate of another record in this run")
+            return True
+        self.seen.add(key)
+        entry = self.dedup.get(key)
+        if entry and entry.rewarded:
+            print(f"⏭️  {name}: already contributed as file id {entry.file_id}")
+            return True
+        if entry:
+            # Unchanged content from an earlier run, possibly under another journal:
+            # carry over what is known instead of encrypting and uploading again
+            if not self.journal.done(key, "uploaded"):
+                self.journal.record(key, "uploaded", name=entry.name, url=entry.url, cid=entry.cid)
+            if entry.file_id and not self.journal.done(key, "registered"):
+                self.journal.record(key, "registered", file_id=entry.file_id)
+        steps = [
+            ("uploaded", partial(self.upload, key, name, text)),
+            ("registered", partial(self.register, key)),
+            ("proof_requested", partial(self.request_proof, key)),
+            ("proof_sent", partial(self.send_proof, key)),
+            ("rewarded", partial(self.request_reward, key)),
+        ]
+        try:
+            for step, run in steps:
+                if not self.journal.done(key, step):
+                    await run()
+            print(f"✅ {name}: file id {self.journal.get(key)['file_id']}")
+            return True
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+            return False
+
+    async def close(self):
+        self.workers.shutdown(wait=False)
+        self.reads.close()
+        self.txs.close()
+        await self.proofs.close()
+
+
+async def contribute_records(contributor: BulkContributor, records, workers: int):
+    """Contribute (name, text) records with `workers` tasks pulling from a bounded queue.
+
+    At most about `2 * workers` records are read ahead, so memory stays flat
+    however large the input is. Returns (contributed, total).
+    """
+    queue = asyncio.Queue(maxsize=workers * 2)
+    results = []
+
+    async def worker():
+        while True:
+            record = await queue.get()
+            if record is None:
+                return
+            results.append(await contributor.contribute(*record))
+
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    try:
+        records = iter(records)
+        while True:
+            # Files are read in a thread so a large one does not stall the workers
+            record = await asyncio.to_thread(next, records, None)
+            if record is None:
+                break
+            await queue.put(record)
+        for _ in tasks:
+            await queue.put(None)
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return sum(results), len(results)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bulk DAT contribution")
+    parser.add_argument("--input", type=Path, required=True, help="Directory of files or a JSONL file")
+    parser.add_argument("--journal", default="bulk_journal.jsonl", help="Progress journal path")
+    parser.add_argument("--dedup", default=DEDUP_PATH, help="Content-hash index of contributed files")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent encrypt/uploads")
+    parser.add_argument(
+        "--proof-wait",
+        type=float,
+        default=60,
+        help="Seconds to poll dispatched proof jobs for completion before exiting",
+    )
+    parser.add_argument(
+        "--segment-mb",
+        type=int,
+        default=0,
+        help="Encrypt files larger than this in parallel segments of this size (0 disables)",
+    )
+    args = parser.parse_args()
+
+    client = Client(private_key=os.getenv("PRIVATE_KEY"))
+    ipfs = CustomPinataIPFS()
+    journal = Journal(args.journal)
+    dedup = DedupIndex(args.dedup)
+    contributor = BulkContributor(
+        client, ipfs, journal, dedup, args.concurrency, args.segment_mb * 1024 * 1024
+    )
+    try:
+        contributed, total = await contribute_records(
+            contributor, read_records(args.input), args.concurrency
+        )
+        print(f"Contributed {contributed}/{total} files")
+        if contributor.proofs.proofs:
+            summary = await contributor.proofs.wait_completed(args.proof_wait)
+            print("Proofs: " + ", ".join(f"{count} {state}" for state, count in sorted(summary.items())))
+    finally:
+        await contributor.close()
+        journal.close()
+        dedup.close()
+        await ipfs.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
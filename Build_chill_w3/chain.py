@@ -0,0 +1,93 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from cache import TTLCache
+
+# Upper bound on blocking chain RPCs (and other blocking work) in flight at once
+CHAIN_MAX_WORKERS = int(os.getenv("CHAIN_MAX_WORKERS", "32"))
+# File metadata cache: number of entries per cache and their lifetime in seconds
+METADATA_CACHE_SIZE = int(os.getenv("METADATA_CACHE_SIZE", "4096"))
+METADATA_CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL", "600"))
+
+
+class AsyncChain:
+    """Async facade over the synchronous LazAI client.
+
+    Every call is dispatched to a bounded thread pool so that a slow RPC only
+    occupies a worker thread instead of blocking the event loop, and
+    concurrent requests overlap their network waits. File records, url to
+    file id lookups and permissions are cached so hot files skip the RPC.
+    With a `ChainReader`, concurrent misses also share one batched request.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_workers: int = CHAIN_MAX_WORKERS,
+        cache_size: int = METADATA_CACHE_SIZE,
+        cache_ttl: float = METADATA_CACHE_TTL,
+        reader=None,
+    ):
+        self.client = client
+        self.reader = reader
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="chain"
+        )
+        self.files = TTLCache(cache_size, cache_ttl)
+        self.file_ids = TTLCache(cache_size, cache_ttl)
+        self.permissions = TTLCache(cache_size, cache_ttl)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking callable in the chain thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(fn, *args, **kwargs)
+        )
+
+    async def _read(self, method: str, function: str, *args):
+        """Call a data registry view through the reader if there is one."""
+        if self.reader is None:
+            return await self.run(getattr(self.client, method), *args)
+        contract = self.client.data_registry_contract
+        return await self.reader.view(
+            getattr(contract.functions, function)(*args), self.executor
+        )
+
+    async def get_file_id_by_url(self, url: str) -> int:
+        file_id = self.file_ids.get(url)
+        if file_id is None:
+            file_id = await self._read("get_file_id_by_url", "getFileIdByUrl", url)
+            # 0 means "not registered yet", which may change at any moment
+            if file_id:
+                self.file_ids.set(url, file_id)
+        return file_id
+
+    async def get_file(self, file_id: int):
+        file = self.files.get(file_id)
+        if file is None:
+            file = await self._read("get_file", "getFile", file_id)
+            self.files.set(file_id, file)
+        return file
+
+    async def get_file_permission(self, file_id: int, account: str):
+        key = (file_id, account)
+        permission = self.permissions.get(key)
+        if permission is None:
+            permission = await self._read(
+                "get_file_permission", "getFilePermission", file_id, account
+            )
+            if permission:
+                self.permissions.set(key, permission)
+        return permission
+
+    def cache_stats(self) -> dict:
+        return {
+            "files": self.files.stats(),
+            "file_ids": self.file_ids.stats(),
+            "permissions": self.permissions.stats(),
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
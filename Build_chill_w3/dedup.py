@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+# Local record of contributed content, keyed by the sha256 of the plaintext
+DEDUP_PATH = os.getenv("DEDUP_PATH", "dedup.db")
+
+
+@dataclass
+class DedupEntry:
+    file_hash: str
+    name: str
+    cid: str
+    url: str
+    file_id: Optional[int] = None
+    rewarded: bool = False
+    updated_at: float = 0.0
+
+
+class DedupIndex:
+    """Content-hash index of files already uploaded and registered.
+
+    Encryption output differs on every run, so the same plaintext would get a
+    new CID and a new chain entry each time it is contributed. Looking the
+    plaintext hash up here first lets unchanged data skip the encryption, the
+    upload and the chain writes.
+    """
+
+    def __init__(self, path: str = DEDUP_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                file_hash TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                cid TEXT NOT NULL,
+                url TEXT NOT NULL,
+                file_id INTEGER,
+                rewarded INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self.files: Dict[str, DedupEntry] = {}
+        for row in self._conn.execute("SELECT * FROM files"):
+            entry = DedupEntry(*row)
+            entry.rewarded = bool(entry.rewarded)
+            self.files[entry.file_hash] = entry
+
+    def get(self, file_hash: str) -> Optional[DedupEntry]:
+        return self.files.get(file_hash)
+
+    def _save(self, entry: DedupEntry):
+        entry.updated_at = time.time()
+        values = asdict(entry)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO files ({', '.join(values)}) "
+                f"VALUES ({', '.join('?' for _ in values)})",
+                tuple(values.values()),
+            )
+            self._conn.commit()
+            self.files[entry.file_hash] = entry
+
+    def record_upload(self, file_hash: str, name: str, cid: str, url: str) -> DedupEntry:
+        entry = DedupEntry(file_hash=file_hash, name=name, cid=cid, url=url)
+        self._save(entry)
+        return entry
+
+    def record_file_id(self, file_hash: str, file_id: int):
+        entry = self.files[file_hash]
+        entry.file_id = file_id
+        self._save(entry)
+
+    def record_reward(self, file_hash: str):
+        entry = self.files[file_hash]
+        entry.rewarded = True
+        self._save(entry)
+
+    def close(self):
+        self._conn.close()
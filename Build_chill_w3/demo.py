@@ -124,22 +124,25 @@ class LazAIDemo:
         ]
         
         results = []
-        for i, query in enumerate(queries, 1):
-            try:
-                print(f"\n🔍 Query {i}: {query}")
-                payload = {
-                    "file_id": 2346,
-                    "query": query,
-                    "limit": 2
-                }
-                response = self.session.post(f"{self.base_url}/query/rag", json=payload)
-                result = response.json()
-                results.append({"query": query, "status": "success", "data_count": len(result.get("data", []))})
-                print(f"✅ Success: {len(result.get('data', []))} results")
-                time.sleep(0.5)  # Rate limiting
-            except Exception as e:
-                results.append({"query": query, "status": "failed", "error": str(e)})
-                print(f"❌ Failed: {e}")
+        try:
+            # One batched request instead of one POST per query
+            payload = {
+                "queries": [
+                    {"file_id": 2346, "query": query, "limit": 2} for query in queries
+                ]
+            }
+            response = self.session.post(f"{self.base_url}/query/rag/batch", json=payload)
+            items = response.json()["results"]
+        except Exception as e:
+            items = [{"error": {"message": str(e)}}] * len(queries)
+        for i, (query, item) in enumerate(zip(queries, items), 1):
+            print(f"\n🔍 Query {i}: {query}")
+            if "error" in item:
+                results.append({"query": query, "status": "failed", "error": item["error"]["message"]})
+                print(f"❌ Failed: {item['error']['message']}")
+            else:
+                results.append({"query": query, "status": "success", "data_count": len(item.get("data", []))})
+                print(f"✅ Success: {len(item.get('data', []))} results")
                 
         self.print_result("Query Summary", results)
         return len([r for r in results if r["status"] == "success"]) > 0
@@ -0,0 +1,405 @@
+import asyncio
+import codecs
+import itertools
+import logging
+import os
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Union
+
+import requests
+import rsa
+from alith import chunk_text
+
+from crypto import MAGIC, decrypt_segments, is_segmented
+
+logger = logging.getLogger(__name__)
+
+# Number of files built concurrently by the background ingestion workers
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+
+
+@dataclass
+class IngestConfig:
+    """Tunables of the collection build pipeline.
+
+    Text is chunked `window_chars` at a time, chunks are embedded
+    `embed_batch_size` at a time and rows are inserted into Milvus once
+    `insert_batch_size` of them are pending, which bounds peak memory.
+    """
+
+    chunk_tokens: int = int(os.getenv("INGEST_CHUNK_TOKENS", "200"))
+    chunk_overlap: float = float(os.getenv("INGEST_CHUNK_OVERLAP", "0.0"))
+    window_chars: int = int(os.getenv("INGEST_WINDOW_CHARS", str(256 * 1024)))
+    embed_batch_size: int = int(os.getenv("INGEST_EMBED_BATCH", "64"))
+    insert_batch_size: int = int(os.getenv("INGEST_INSERT_BATCH", "512"))
+    read_size: int = int(os.getenv("INGEST_READ_SIZE", str(64 * 1024)))
+
+
+class StageTimer:
+    """Accumulates wall-clock seconds per pipeline stage."""
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def to_dict(self) -> dict:
+        return {name: round(seconds, 4) for name, seconds in self.seconds.items()}
+
+
+def load_private_key(rsa_private_key: str) -> rsa.PrivateKey:
+    """Parse a PKCS#1 PEM private key; do it once, not per file."""
+    return rsa.PrivateKey.load_pkcs1(rsa_private_key.strip().encode())
+
+
+def unwrap_password(encryption_key: str, rsa_private_key: Union[str, rsa.PrivateKey]) -> str:
+    """Recover the file password from the RSA-wrapped hex encryption key.
+
+    The RSA decrypt takes tens of milliseconds; call it off the event loop.
+    """
+    if isinstance(rsa_private_key, str):
+        rsa_private_key = load_private_key(rsa_private_key)
+    password = rsa.decrypt(bytes.fromhex(encryption_key.removeprefix("0x")), rsa_private_key)
+    return password.decode()
+
+
+def decrypt_stream(
+    chunks: Iterable[bytes],
+    password: str,
+    read_size: int = 64 * 1024,
+    timer: Optional[StageTimer] = None,
+) -> Iterator[bytes]:
+    """Decrypt a stream of `alith.data.encrypt` (gpg symmetric) ciphertext.
+
+    The ciphertext is piped through a gpg process by a feeder thread while the
+    plaintext is yielded `read_size` bytes at a time, so neither side is ever
+    held in memory as a whole. Time spent pulling ciphertext is recorded as
+    the "fetch" stage and time waiting on plaintext as "decrypt", less the
+    fetching done meanwhile, so gpg waiting on the download is not counted twice.
+    """
+    process = subprocess.Popen(
+        [
+            "gpg", "--pinentry-mode", "loopback", "--no-tty", "--batch", "--quiet",
+            "--passphrase-fd", "0", "--decrypt",
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    errors = []
+    stderr = []
+    fetched = [0.0]
+
+    def feed():
+        try:
+            process.stdin.write(password.encode() + b"\n")
+            iterator = iter(chunks)
+            while True:
+                start = time.perf_counter()
+                chunk = next(iterator, None)
+                elapsed = time.perf_counter() - start
+                fetched[0] += elapsed
+                if timer:
+                    timer.add("fetch", elapsed)
+                if chunk is None:
+                    break
+                process.stdin.write(chunk)
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            errors.append(e)
+            process.kill()
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    drainer = threading.Thread(
+        target=lambda: stderr.append(process.stderr.read()), daemon=True
+    )
+    feeder.start()
+    drainer.start()
+    try:
+        while True:
+            start, fetched_before = time.perf_counter(), fetched[0]
+            data = process.stdout.read(read_size)
+            if timer:
+                waited = time.perf_counter() - start
+                timer.add("decrypt", max(0.0, waited - (fetched[0] - fetched_before)))
+            if not data:
+                break
+            yield data
+        feeder.join()
+        drainer.join()
+        if errors:
+            raise errors[0]
+        if process.wait() != 0:
+            message = b"".join(stderr).decode(errors="replace").strip()
+            raise ValueError(f"Decryption failed: {message}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def stream_decrypt_url(
+    url: str,
+    password: str,
+    read_size: int = 64 * 1024,
+    timer: Optional[StageTimer] = None,
+) -> Iterator[str]:
+    """Download, decrypt and UTF-8 decode a file as a stream of text pieces.
+
+    Both single gpg payloads and segmented `crypto` streams are accepted; the
+    format is told apart by the first bytes of the body.
+    """
+    with requests.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        body = response.iter_content(chunk_size=read_size)
+        head = b""
+        for chunk in body:
+            head += chunk
+            if len(head) >= len(MAGIC):
+                break
+        body = itertools.chain([head], body)
+        if is_segmented(head):
+            plaintext = decrypt_segments(body, password, timer=timer)
+        else:
+            plaintext = decrypt_stream(body, password, read_size, timer)
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        for data in plaintext:
+            text = decoder.decode(data)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+
+def iter_chunks(
+    texts: Iterable[str], config: IngestConfig, timer: Optional[StageTimer] = None
+) -> Iterator[str]:
+    """Chunk a stream of text pieces a window at a time.
+
+    Windows are cut on the last whitespace so no word is split between two
+    `chunk_text` calls. Only those calls are recorded as the "chunk" stage;
+    pulling `texts` (fetch and decrypt) is timed by whoever produces them.
+    """
+
+    def chunk(text: str) -> List[str]:
+        start = time.perf_counter()
+        chunks = chunk_text(text, config.chunk_tokens, config.chunk_overlap)
+        if timer:
+            timer.add("chunk", time.perf_counter() - start)
+        return chunks
+
+    buffer = ""
+    for text in texts:
+        buffer += text
+        start = 0
+        while len(buffer) - start >= config.window_chars:
+            end = start + config.window_chars
+            cut = buffer.rfind(" ", start, end)
+            cut = cut if cut > start else end
+            yield from chunk(buffer[start:cut])
+            start = cut
+        buffer = buffer[start:]
+    if buffer.strip():
+        yield from chunk(buffer)
+
+
+def save_chunks(
+    store,
+    collection_name: str,
+    chunks: Iterable[str],
+    config: IngestConfig,
+    timer: StageTimer,
+) -> int:
+    """Embed and insert chunks in fixed-size batches, returning the row count.
+
+    Rows use the same layout as `MilvusStore.save_docs`, with ids continuing
+    across batches. Pass `timer` to `iter_chunks` too to get the "chunk" stage.
+    """
+    rows: List[dict] = []
+    count = 0
+
+    def flush():
+        with timer.stage("insert"):
+            store.client.insert(collection_name=collection_name, data=rows)
+        rows.clear()
+
+    for batch in _batched(chunks, config.embed_batch_size):
+        with timer.stage("embed"):
+            vectors = store.embedding_fn.encode_documents(batch)
+        for text, vector in zip(batch, vectors):
+            rows.append({"id": count, "vector": vector, "text": text, "subject": "history"})
+            count += 1
+        if len(rows) >= config.insert_batch_size:
+            flush()
+    if rows:
+        flush()
+    return count
+
+
+def _batched(chunks: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(chunks)
+    while True:
+        batch = [chunk for _, chunk in zip(range(size), iterator)]
+        if not batch:
+            return
+        yield batch
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same result (or exception) instead of repeating it.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+
+    def __contains__(self, key) -> bool:
+        return key in self._inflight
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A cancelled waiter must not cancel the shared work for the others
+        return await asyncio.shield(task)
+
+
+@dataclass
+class IngestJob:
+    file_id: int
+    status: str = "queued"
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    timings: Optional[dict] = None
+    done: Optional[asyncio.Future] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("ready", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "file_id": self.file_id,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "timings": self.timings,
+        }
+
+
+class IngestQueue:
+    """Background worker pool that builds file collections ahead of queries.
+
+    `build` is a coroutine function taking a file id and optionally returning
+    per-stage timings. At most one job per file is queued or running at a
+    time, and finished jobs are kept (up to `history`) so their status can
+    still be reported. `stop()` fails every job still queued or running, so
+    nothing waiting on one is left hanging.
+    """
+
+    def __init__(self, build, workers: int = INGEST_WORKERS, history: int = 1024):
+        self.build = build
+        self.workers = workers
+        self.history = history
+        self.jobs = OrderedDict()
+        self._queue = None
+        self._tasks = []
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs no worker picked up would leave their waiters hanging
+        while self._queue is not None and not self._queue.empty():
+            job = self._queue.get_nowait()
+            job.finished_at = time.time()
+            self._fail(job, RuntimeError(f"Ingestion stopped before file {job.file_id} was built"))
+
+    def get(self, file_id: int) -> Optional[IngestJob]:
+        return self.jobs.get(file_id)
+
+    def submit(self, file_id: int) -> IngestJob:
+        """Queue a build for the file unless one is already pending."""
+        job = self.jobs.get(file_id)
+        if job is not None and not job.finished:
+            return job
+        job = IngestJob(file_id, done=asyncio.get_running_loop().create_future())
+        self.jobs[file_id] = job
+        self.jobs.move_to_end(file_id)
+        self._prune()
+        self._queue.put_nowait(job)
+        return job
+
+    async def wait(self, job: IngestJob):
+        await asyncio.shield(job.done)
+
+    def _prune(self):
+        while len(self.jobs) > self.history:
+            oldest = next(iter(self.jobs.values()))
+            if not oldest.finished:
+                break
+            self.jobs.popitem(last=False)
+
+    def _fail(self, job: IngestJob, error: Exception):
+        job.status, job.error = "failed", str(error)
+        if not job.done.done():
+            job.done.set_exception(error)
+            # Mark the exception as retrieved when nobody is waiting on it
+            job.done.exception()
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.timings = await self.build(job.file_id)
+            except asyncio.CancelledError:
+                # Waiters get an error they handle like any failed build
+                self._fail(job, RuntimeError(f"Ingestion stopped while building file {job.file_id}"))
+                raise
+            except Exception as e:
+                logger.error(f"Ingestion failed for file {job.file_id}: {e}")
+                self._fail(job, e)
+            else:
+                job.status = "ready"
+                job.done.set_result(None)
+            finally:
+                job.finished_at = time.time()
+                self._queue.task_done()
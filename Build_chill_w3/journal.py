@@ -0,0 +1,80 @@
+import json
+import os
+import time
+
+# Rewrite the log as one snapshot line per key once it holds this many lines per key
+JOURNAL_COMPACT_RATIO = float(os.getenv("JOURNAL_COMPACT_RATIO", "4"))
+
+
+class Journal:
+    """Append-only JSONL log of per-file contribution progress.
+
+    Every completed step is appended as one line, with whatever the step
+    produced (url, file id, job id, transaction hash), and fsynced before the
+    caller moves on, so a crashed or interrupted bulk run can be restarted and
+    skip whatever already happened. Steps that send a transaction record the
+    hash first, so a restart waits for that transaction instead of paying
+    for a second one. Once the log grows well past one line per key it is
+    compacted into a snapshot on open, keeping recovery of large batches fast.
+    """
+
+    def __init__(self, path: str, fsync: bool = True, compact_ratio: float = JOURNAL_COMPACT_RATIO):
+        self.path = path
+        self.fsync = fsync
+        self.state = {}
+        lines = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn last line from a crash mid-write
+                        continue
+                    self._apply(entry)
+                    lines += 1
+        if compact_ratio and lines > compact_ratio * max(len(self.state), 1):
+            self._write_snapshot()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _apply(self, entry: dict):
+        if entry.get("snapshot"):
+            self.state[entry["key"]] = {
+                k: v for k, v in entry.items() if k not in ("key", "snapshot")
+            }
+            return
+        state = self.state.setdefault(entry["key"], {"steps": []})
+        state["steps"].append(entry["step"])
+        state.update({k: v for k, v in entry.items() if k not in ("key", "step", "at")})
+
+    def _write_snapshot(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, state in self.state.items():
+                f.write(json.dumps({"key": key, "snapshot": True, **state}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        # Atomic on POSIX: readers see either the old log or the full snapshot
+        os.replace(tmp_path, self.path)
+
+    def compact(self):
+        self._file.close()
+        self._write_snapshot()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def get(self, key: str) -> dict:
+        return self.state.get(key, {"steps": []})
+
+    def done(self, key: str, step: str) -> bool:
+        return step in self.get(key)["steps"]
+
+    def record(self, key: str, step: str, **fields):
+        entry = {"key": key, "step": step, "at": time.time(), **fields}
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._apply(entry)
+
+    def close(self):
+        self._file.close()
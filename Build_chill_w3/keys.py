@@ -0,0 +1,49 @@
+import threading
+
+import rsa
+from eth_account.messages import encode_defunct
+
+ENCRYPTION_SEED = "Sign to retrieve your encryption key"
+
+
+class KeyMaterial:
+    """Contribution key material, derived once per session instead of per file.
+
+    Holds the password signed from the encryption seed, the parsed RSA public
+    key of every verified computing node and the password encrypted for each
+    of them. The password never changes within a session, so one encrypted
+    blob per node serves every file sent to that node.
+    """
+
+    def __init__(self, wallet, encryption_seed: str = ENCRYPTION_SEED):
+        self.wallet = wallet
+        self.encryption_seed = encryption_seed
+        self._password = None
+        self._public_keys = {}
+        self._encryption_keys = {}
+        self._lock = threading.Lock()
+
+    @property
+    def password(self) -> str:
+        if self._password is None:
+            message = encode_defunct(text=self.encryption_seed)
+            self._password = self.wallet.sign_message(message).signature.hex()
+        return self._password
+
+    def public_key(self, pub_key: str) -> rsa.PublicKey:
+        key = self._public_keys.get(pub_key)
+        if key is None:
+            key = rsa.PublicKey.load_pkcs1(pub_key.strip().encode(), format="PEM")
+            self._public_keys[pub_key] = key
+        return key
+
+    def encryption_key(self, pub_key: str) -> str:
+        """Hex RSA encryption of the password for the node owning `pub_key`."""
+        with self._lock:
+            encryption_key = self._encryption_keys.get(pub_key)
+            if encryption_key is None:
+                encryption_key = rsa.encrypt(
+                    self.password.encode(), self.public_key(pub_key)
+                ).hex()
+                self._encryption_keys[pub_key] = encryption_key
+            return encryption_key
@@ -1,6 +1,9 @@
+import asyncio
+import base64
 import logging
 import sys
 import json
+from typing import List
 import uvicorn
 import argparse
 import os
@@ -11,14 +14,30 @@ load_dotenv()
 
 from fastapi import FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
 
 from alith.lazai import Client
 from alith.lazai.node.middleware import HeaderValidationMiddleware
-from alith.lazai.node.validator import decrypt_file_url
-from alith import MilvusStore, chunk_text
+from alith import MilvusStore
 from alith.query.types import QueryRequest
 from alith.query.settlement import QueryBillingMiddleware
 
+from chain import AsyncChain
+from manifest import Manifest
+from reads import ChainReader, cache_chain_id
+from search import Searcher
+from ingest import (
+    IngestConfig,
+    IngestQueue,
+    SingleFlight,
+    StageTimer,
+    iter_chunks,
+    load_private_key,
+    save_chunks,
+    stream_decrypt_url,
+    unwrap_password,
+)
+
 # Get OpenAI API key from environment variable
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 RSA_PRIVATE_KEY_BASE64 = os.getenv("RSA_PRIVATE_KEY_BASE64")
@@ -47,29 +66,197 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 client = Client(private_key=PRIVATE_KEY)
+cache_chain_id(client.w3)
+chain = AsyncChain(client, reader=ChainReader(client))
 app = FastAPI(title="Alith LazAI Privacy Data Query Node", version="1.0.0")
 
 store = MilvusStore()
 collection_prefix = "query_"
+searcher = Searcher(store, chain)
+builds = SingleFlight()
+ingest_config = IngestConfig()
+# Parsed once; every build reuses it
+rsa_private_key = load_private_key(base64.b64decode(RSA_PRIVATE_KEY_BASE64).decode())
+manifest = Manifest()
+embedding_model = os.getenv("EMBEDDING_MODEL") or getattr(
+    store.embedding_fn, "model_name", type(store.embedding_fn).__name__
+)
+
+
+def is_current(entry) -> bool:
+    return manifest.is_current(entry, ingest_config, embedding_model, store.dimension)
+
+
+async def build_collection(file_id: int, file):
+    """Decrypt the file and cache its chunks in the vector database.
+
+    Returns the seconds spent in each stage of the build.
+    """
+    file_url, file_hash = file[2], file[3]
+    collection_name = collection_prefix + file_hash
+    if await chain.run(store.has_collection, collection_name):
+        entry = manifest.get(collection_name)
+        # Collections built before the manifest existed are trusted as they are
+        if entry is None or is_current(entry):
+            return None
+        logger.info(f"Rebuilding stale collection {collection_name}")
+        await chain.run(store.client.drop_collection, collection_name)
+        manifest.remove(collection_name)
+    timer = StageTimer()
+    encryption_key = await chain.get_file_permission(
+        file_id, client.contract_config.data_registry_address
+    )
+    password = await chain.run(unwrap_password, encryption_key, rsa_private_key)
+    searcher.invalidate(file_hash)
+    await chain.run(store.create_collection, collection_name=collection_name)
+    try:
+        # Fetch, decrypt, chunk, embed and insert all stream through one thread
+        texts = stream_decrypt_url(file_url, password, ingest_config.read_size, timer)
+        count = await chain.run(
+            save_chunks,
+            store,
+            collection_name,
+            iter_chunks(texts, ingest_config, timer),
+            ingest_config,
+            timer,
+        )
+    except Exception:
+        # Never leave a half-filled collection behind, the next query rebuilds it
+        await chain.run(store.client.drop_collection, collection_name)
+        raise
+    finally:
+        searcher.invalidate(file_hash)
+    manifest.record(
+        collection_name, file_id, file, ingest_config, embedding_model, store.dimension, count
+    )
+    timings = timer.to_dict()
+    logger.info(f"Built collection {collection_name} with {count} chunks: {timings}")
+    return timings
+
+
+async def collection_ready(collection_name: str) -> bool:
+    if collection_name in builds:
+        return False
+    entry = manifest.get(collection_name)
+    if entry is not None:
+        return is_current(entry)
+    return await chain.run(store.has_collection, collection_name)
+
+
+async def ensure_collection(file_id: int, file):
+    """Build the collection once, however many requests ask for it concurrently."""
+    collection_name = collection_prefix + file[3]
+    if await collection_ready(collection_name):
+        return None
+    return await builds.do(collection_name, lambda: build_collection(file_id, file))
+
+
+async def ingest_file(file_id: int):
+    file_id, file = await resolve_file(file_id, None)
+    return await ensure_collection(file_id, file)
+
+
+ingestion = IngestQueue(ingest_file)
+
+
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryRequest]
+
+
+def error_body(message: str, type: str) -> dict:
+    return {"error": {"message": message, "type": type}}
+
+
+def query_result(data, file_id: int, file) -> dict:
+    return {
+        "data": data,
+        "owner": file[1],
+        "file_id": file_id,
+        "file_url": file[2],
+        "file_hash": file[3],
+    }
+
+
+async def resolve_file(file_id: int, file_url: str):
+    """Return (file_id, file record) for a file id or url, or (None, None).
+
+    Files with a collection in the manifest are resolved without the chain.
+    """
+    if file_url:
+        entry = manifest.file_urls.get(file_url)
+        file_id = entry.file_id if entry else await chain.get_file_id_by_url(file_url)
+    if not file_id:
+        return None, None
+    entry = manifest.file_ids.get(file_id)
+    if entry is not None:
+        return file_id, entry.file
+    return file_id, await chain.get_file(file_id)
+
+
+@app.on_event("startup")
+async def startup():
+    # Forget manifest entries whose Milvus collection is gone, e.g. alith.db was reset
+    for collection_name in list(manifest.collections):
+        if not await chain.run(store.has_collection, collection_name):
+            manifest.remove(collection_name)
+    logger.info(f"Loaded {len(manifest.collections)} warm collections from the manifest")
+    ingestion.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await ingestion.stop()
+    chain.close()
+    manifest.close()
+
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "message": "Server is running"}
 
+@app.get("/stats")
+async def stats():
+    return {
+        "metadata_cache": chain.cache_stats(),
+        "chain_reads": chain.reader.stats(),
+        "query_cache": searcher.cache_stats(),
+        "collections": len(manifest.collections),
+    }
+
 @app.get("/")
 async def root():
     return {"message": "Alith LazAI Privacy Data Query Node", "version": "1.0.0"}
 
 
+@app.post("/ingest/{file_id}", status_code=status.HTTP_202_ACCEPTED)
+async def ingest(file_id: int):
+    """Pre-warm the vector collection of a file in the background."""
+    return ingestion.submit(file_id).to_dict()
+
+
+@app.get("/ingest/{file_id}")
+async def ingest_status(file_id: int):
+    job = ingestion.get(file_id)
+    if job is None:
+        return Response(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content=json.dumps(
+                {
+                    "error": {
+                        "message": f"No ingestion job for file {file_id}",
+                        "type": "not_found_error",
+                    }
+                }
+            ),
+        )
+    return job.to_dict()
+
+
 @app.post("/query/rag")
-async def query_rag(req: QueryRequest):
+async def query_rag(req: QueryRequest, wait: bool = True):
     try:
-        file_id = req.file_id
-        if req.file_url:
-            file_id = client.get_file_id_by_url(req.file_url)
-        if file_id:
-            file = client.get_file(file_id)
-        else:
+        file_id, file = await resolve_file(req.file_id, req.file_url)
+        if file is None:
             return Response(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 content=json.dumps(
@@ -81,27 +268,23 @@ async def query_rag(req: QueryRequest):
                     }
                 ),
             )
-        owner, file_url, file_hash = file[1], file[2], file[3]
+        file_hash = file[3]
         collection_name = collection_prefix + file_hash
-        # Cache data in the vector database
-        if not store.has_collection(collection_name):
-            encryption_key = client.get_file_permission(
-                file_id, client.contract_config.data_registry_address
-            )
-            data = decrypt_file_url(file_url, encryption_key).decode("utf-8")
-            store.create_collection(collection_name=collection_name)
-            store.save_docs(chunk_text(data), collection_name=collection_name)
-        data = store.search_in(
-            req.query, limit=req.limit, collection_name=collection_name
-        )
+        # Repeated queries are answered from the result cache without any I/O
+        data = searcher.cached(file_hash, req.query, req.limit)
+        if data is None:
+            # Cache data in the vector database through the ingestion workers
+            if not await collection_ready(collection_name):
+                job = ingestion.submit(file_id)
+                if not wait:
+                    return Response(
+                        status_code=status.HTTP_202_ACCEPTED,
+                        content=json.dumps({"ingestion": job.to_dict()}),
+                    )
+                await ingestion.wait(job)
+            data = await searcher.search(file_hash, collection_name, req.query, req.limit)
         logger.info(f"Successfully processed request for file: {file}")
-        return {
-            "data": data,
-            "owner": owner,
-            "file_id": file_id,
-            "file_url": file_url,
-            "file_hash": file_hash,
-        }
+        return query_result(data, file_id, file)
     except Exception as e:
         return Response(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -116,6 +299,94 @@ async def query_rag(req: QueryRequest):
         )
 
 
+@app.post("/query/rag/batch")
+async def query_rag_batch(batch: BatchQueryRequest):
+    """Answer many (file, query, limit) items in one request.
+
+    Files are resolved and built once per collection, all uncached query texts
+    are embedded in a single batched call and the searches run concurrently.
+    Every item gets either its result or its own error.
+    """
+    items = batch.queries
+    results = [None] * len(items)
+
+    # 1. Resolve each distinct file reference once
+    refs = list({(req.file_id, req.file_url) for req in items})
+    resolved = dict(
+        zip(
+            refs,
+            await asyncio.gather(
+                *(resolve_file(*ref) for ref in refs), return_exceptions=True
+            ),
+        )
+    )
+    # 2. Make sure every referenced collection is built, one job per file
+    jobs = {}
+    for ref, value in resolved.items():
+        if isinstance(value, Exception) or value[1] is None:
+            continue
+        file_id, file = value
+        collection_name = collection_prefix + file[3]
+        if collection_name not in jobs and not await collection_ready(collection_name):
+            jobs[collection_name] = ingestion.submit(file_id)
+    built = dict(
+        zip(
+            jobs,
+            await asyncio.gather(
+                *(ingestion.wait(job) for job in jobs.values()), return_exceptions=True
+            ),
+        )
+    )
+
+    pending = []
+    for i, req in enumerate(items):
+        value = resolved[(req.file_id, req.file_url)]
+        if isinstance(value, Exception):
+            results[i] = error_body(f"Error resolving file: {value}", "internal_error")
+            continue
+        file_id, file = value
+        if file is None:
+            results[i] = error_body("File ID or URL is required", "invalid_request_error")
+            continue
+        collection_name = collection_prefix + file[3]
+        if isinstance(built.get(collection_name), Exception):
+            results[i] = error_body(
+                f"Error building collection: {built[collection_name]}", "internal_error"
+            )
+            continue
+        data = searcher.cached(file[3], req.query, req.limit)
+        if data is None:
+            pending.append((i, req, file_id, file))
+        else:
+            results[i] = query_result(data, file_id, file)
+
+    # 3. Embed all uncached query texts in one call, 4. search concurrently
+    try:
+        vectors = await searcher.embed([req.query for _, req, _, _ in pending])
+    except Exception as e:
+        vectors = [e] * len(pending)
+
+    async def search(req, file, vector):
+        if isinstance(vector, Exception):
+            raise vector
+        file_hash = file[3]
+        return await searcher.search(
+            file_hash, collection_prefix + file_hash, req.query, req.limit, vector=vector
+        )
+
+    found = await asyncio.gather(
+        *(search(req, file, vector) for (_, req, _, file), vector in zip(pending, vectors)),
+        return_exceptions=True,
+    )
+    for (i, req, file_id, file), data in zip(pending, found):
+        if isinstance(data, Exception):
+            results[i] = error_body(f"Error processing query: {data}", "internal_error")
+        else:
+            results[i] = query_result(data, file_id, file)
+    logger.info(f"Processed batch of {len(items)} queries over {len(refs)} files")
+    return {"results": results}
+
+
 def run(host: str = "0.0.0.0", port: int = 8000, *, settlement: bool = False):
 
     # FastAPI app and LazAI client initialization
@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+# Local record of the collections this node has built, next to Milvus' alith.db
+MANIFEST_PATH = os.getenv("MANIFEST_PATH", "manifest.db")
+
+
+@dataclass
+class CollectionEntry:
+    collection_name: str
+    file_id: int
+    owner: str
+    file_url: str
+    file_hash: str
+    chunk_tokens: int
+    chunk_overlap: float
+    embedding_model: str
+    dimension: int
+    chunk_count: int
+    built_at: float
+
+    @property
+    def file(self) -> list:
+        """The entry in the shape of a `Client.get_file` record."""
+        return [self.file_id, self.owner, self.file_url, self.file_hash]
+
+
+class Manifest:
+    """Persistent manifest of built collections, loaded once at startup.
+
+    Lets a restarted node serve warm collections straight away: lookups are
+    answered from memory without asking Milvus or the chain, and entries built
+    with other chunking parameters or another embedding model are reported as
+    stale so they get rebuilt.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS collections (
+                collection_name TEXT PRIMARY KEY,
+                file_id INTEGER NOT NULL,
+                owner TEXT NOT NULL,
+                file_url TEXT NOT NULL,
+                file_hash TEXT NOT NULL,
+                chunk_tokens INTEGER NOT NULL,
+                chunk_overlap REAL NOT NULL,
+                embedding_model TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                chunk_count INTEGER NOT NULL,
+                built_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self.collections: Dict[str, CollectionEntry] = {}
+        self.file_ids: Dict[int, CollectionEntry] = {}
+        self.file_urls: Dict[str, CollectionEntry] = {}
+        for row in self._conn.execute("SELECT * FROM collections"):
+            self._index(CollectionEntry(*row))
+
+    def _index(self, entry: CollectionEntry):
+        self.collections[entry.collection_name] = entry
+        self.file_ids[entry.file_id] = entry
+        self.file_urls[entry.file_url] = entry
+
+    def get(self, collection_name: str) -> Optional[CollectionEntry]:
+        return self.collections.get(collection_name)
+
+    def is_current(
+        self, entry: CollectionEntry, config, embedding_model: str, dimension: int
+    ) -> bool:
+        return (
+            entry.chunk_tokens == config.chunk_tokens
+            and entry.chunk_overlap == config.chunk_overlap
+            and entry.embedding_model == embedding_model
+            and entry.dimension == dimension
+        )
+
+    def record(
+        self,
+        collection_name: str,
+        file_id: int,
+        file,
+        config,
+        embedding_model: str,
+        dimension: int,
+        chunk_count: int,
+    ) -> CollectionEntry:
+        entry = CollectionEntry(
+            collection_name=collection_name,
+            file_id=file_id,
+            owner=file[1],
+            file_url=file[2],
+            file_hash=file[3],
+            chunk_tokens=config.chunk_tokens,
+            chunk_overlap=config.chunk_overlap,
+            embedding_model=embedding_model,
+            dimension=dimension,
+            chunk_count=chunk_count,
+            built_at=time.time(),
+        )
+        values = asdict(entry)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO collections ({', '.join(values)}) "
+                f"VALUES ({', '.join('?' for _ in values)})",
+                tuple(values.values()),
+            )
+            self._conn.commit()
+            self._index(entry)
+        return entry
+
+    def remove(self, collection_name: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM collections WHERE collection_name = ?", (collection_name,)
+            )
+            self._conn.commit()
+            entry = self.collections.pop(collection_name, None)
+            if entry:
+                self.file_ids.pop(entry.file_id, None)
+                self.file_urls.pop(entry.file_url, None)
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional
+
+import aiohttp
+from alith.lazai import ProofRequest
+
+from keys import KeyMaterial
+from reads import ChainReader
+
+# Proof requests in flight per verified computing node
+PROOF_NODE_CONCURRENCY = int(os.getenv("PROOF_NODE_CONCURRENCY", "16"))
+PROOF_RETRIES = int(os.getenv("PROOF_RETRIES", "3"))
+PROOF_TIMEOUT = float(os.getenv("PROOF_TIMEOUT", "60"))
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+# `status` of a VerifiedComputing job once the node has submitted its proof
+JOB_COMPLETED = 2
+
+
+@dataclass
+class ProofStatus:
+    job_id: int
+    file_id: int
+    node_url: Optional[str] = None
+    state: str = "pending"  # pending | sent | failed | completed
+    attempts: int = 0
+    error: Optional[str] = None
+    sent_at: Optional[float] = None
+    completed_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class RetryableProofError(Exception):
+    pass
+
+
+class ProofDispatcher:
+    """Send proof requests to verified computing nodes without blocking.
+
+    Each node gets its own keep-alive session whose connection pool doubles
+    as the node's concurrency limit, so thousands of proofs go out in
+    parallel over a handful of reused connections. Job and node records come
+    from a `ChainReader`, which caches them and batches concurrent lookups,
+    transient failures are retried with jittered backoff, and the outcome of
+    every job is kept in `proofs`.
+    """
+
+    def __init__(
+        self,
+        reader: ChainReader,
+        keys: KeyMaterial,
+        encryption_seed: str,
+        executor: Optional[Executor] = None,
+        per_node: int = PROOF_NODE_CONCURRENCY,
+        retries: int = PROOF_RETRIES,
+        backoff: float = 0.5,
+        timeout: float = PROOF_TIMEOUT,
+    ):
+        self.reader = reader
+        self.executor = executor
+        self.keys = keys
+        self.encryption_seed = encryption_seed
+        self.per_node = per_node
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.sessions: Dict[str, aiohttp.ClientSession] = {}
+        self.proofs: Dict[int, ProofStatus] = {}
+
+    def session(self, node_url: str) -> aiohttp.ClientSession:
+        session = self.sessions.get(node_url)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=self.per_node, keepalive_timeout=60)
+            session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self.sessions[node_url] = session
+        return session
+
+    async def _post(self, node_url: str, payload: dict):
+        async with self.session(node_url).post(f"{node_url}/proof", json=payload) as response:
+            if response.status == 200:
+                return
+            text = await response.text()
+            if response.status in RETRYABLE_STATUSES:
+                raise RetryableProofError(f"Proof node returned {response.status}: {text}")
+            raise RuntimeError(f"Proof request failed: {text}")
+
+    async def dispatch(self, job_id: int, file_id: int, file_url: str) -> ProofStatus:
+        """Send the proof request for one job, retrying transient failures."""
+        status = self.proofs.get(job_id)
+        if status is None:
+            status = self.proofs[job_id] = ProofStatus(job_id=job_id, file_id=file_id)
+        if status.state in ("sent", "completed"):
+            return status
+        try:
+            node = await self.reader.job_node(job_id, self.executor)
+            status.node_url = node[1]
+            request = ProofRequest(
+                job_id=job_id,
+                file_id=file_id,
+                file_url=file_url,
+                encryption_key=self.keys.encryption_key(node[-1]),
+                encryption_seed=self.encryption_seed,
+                proof_url=None,
+            )
+            payload = request.model_dump()
+            for attempt in range(self.retries + 1):
+                status.attempts += 1
+                try:
+                    await self._post(status.node_url, payload)
+                    break
+                except (RetryableProofError, aiohttp.ClientError, asyncio.TimeoutError):
+                    if attempt == self.retries:
+                        raise
+                    delay = self.backoff * 2**attempt
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            status.state, status.error, status.sent_at = "sent", None, time.time()
+        except Exception as e:
+            status.state, status.error = "failed", str(e) or type(e).__name__
+        return status
+
+    async def dispatch_many(self, jobs: Iterable[tuple]) -> List[ProofStatus]:
+        """Dispatch (job_id, file_id, file_url) triples concurrently."""
+        return await asyncio.gather(*(self.dispatch(*job) for job in jobs))
+
+    async def refresh(self, job_id: int) -> ProofStatus:
+        """Re-read a dispatched job from the chain and mark it completed if it is."""
+        status = self.proofs[job_id]
+        if status.state == "sent":
+            contract = self.reader.client.verified_computing_contract
+            job = await self.reader.view(contract.functions.getJob(job_id), self.executor)
+            if job[2] == JOB_COMPLETED:
+                status.state, status.completed_at = "completed", time.time()
+        return status
+
+    async def wait_completed(self, timeout: float, interval: float = 5.0) -> dict:
+        """Poll sent jobs until all are completed or `timeout` seconds pass.
+
+        The status reads of one poll are coalesced by the reader into one
+        batch. Returns `summary()`; jobs still "sent" did not complete in time.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            sent = [job_id for job_id, status in self.proofs.items() if status.state == "sent"]
+            if sent:
+                # A failed read leaves the job "sent" for the next poll
+                await asyncio.gather(*(self.refresh(job_id) for job_id in sent), return_exceptions=True)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not any(self.proofs[job_id].state == "sent" for job_id in sent):
+                return self.summary()
+            await asyncio.sleep(min(interval, remaining))
+
+    def summary(self) -> dict:
+        return dict(Counter(status.state for status in self.proofs.values()))
+
+    async def close(self):
+        for session in self.sessions.values():
+            await session.close()
+        self.sessions.clear()
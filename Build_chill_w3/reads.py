@@ -0,0 +1,342 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor
+from typing import Dict, Iterable, List, Optional
+
+from eth_abi.grammar import TupleType, parse
+from eth_utils import get_abi_output_types
+from web3 import Web3
+
+# Multicall3 is deployed at the same address on most EVM chains; reads use it
+# only when this is set, otherwise independent calls share a JSON-RPC batch
+MULTICALL3_ADDRESS = os.getenv("MULTICALL3_ADDRESS")
+READ_BATCH_SIZE = int(os.getenv("READ_BATCH_SIZE", "100"))
+# How long concurrent async reads wait for each other before going out together
+READ_BATCH_WINDOW = float(os.getenv("READ_BATCH_WINDOW", "0.005"))
+
+MULTICALL3_ABI = [
+    {
+        "name": "aggregate3",
+        "type": "function",
+        "stateMutability": "payable",
+        "inputs": [
+            {
+                "name": "calls",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"},
+                ],
+            }
+        ],
+        "outputs": [
+            {
+                "name": "returnData",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"},
+                ],
+            }
+        ],
+    }
+]
+
+
+class ReadError(Exception):
+    pass
+
+
+class BatchRejected(ReadError):
+    pass
+
+
+def _checksum(abi_type, value):
+    """Checksum decoded addresses the way web3's own call results are."""
+    if abi_type.is_array:
+        return [_checksum(abi_type.item_type, v) for v in value]
+    if isinstance(abi_type, TupleType):
+        return tuple(_checksum(t, v) for t, v in zip(abi_type.components, value))
+    if abi_type.base == "address":
+        return Web3.to_checksum_address(value)
+    return value
+
+
+def cache_chain_id(w3: Web3):
+    """Let `w3`'s provider answer chain id requests from its cache.
+
+    web3's validation middleware asks for the chain id around every call and
+    it never changes. This changes the provider for every user of `w3`.
+    """
+    w3.provider.cacheable_requests = {"eth_chainId", "net_version"}
+    w3.provider.cache_allowed_requests = True
+
+
+class ChainReader:
+    """Batched, cached view calls over `alith.lazai.Client`.
+
+    Independent calls go out together, through Multicall3 when
+    `MULTICALL3_ADDRESS` is set or as one JSON-RPC batch otherwise, falling
+    back to one call at a time if the endpoint supports neither. Records that
+    never change once written (a job's node, a node's url and public key) are
+    cached for the life of the reader.
+    """
+
+    def __init__(
+        self,
+        client,
+        multicall_address: Optional[str] = MULTICALL3_ADDRESS,
+        batch_size: int = READ_BATCH_SIZE,
+        window: float = READ_BATCH_WINDOW,
+    ):
+        self.client = client
+        self.w3: Web3 = client.w3
+        self.batch_size = batch_size
+        self.window = window
+        self.multicall = (
+            self.w3.eth.contract(
+                address=Web3.to_checksum_address(multicall_address), abi=MULTICALL3_ABI
+            )
+            if multicall_address
+            else None
+        )
+        self.batching = True
+        self.requests = 0
+        self.calls = 0
+        self.job_nodes: Dict[int, str] = {}
+        self.nodes: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        self._pending = []
+        self._flush = None
+
+    def _decode(self, function, data: bytes):
+        types = get_abi_output_types(function.abi)
+        values = [_checksum(parse(t), v) for t, v in zip(types, self.w3.codec.decode(types, data))]
+        return values[0] if len(values) == 1 else values
+
+    def _multicall(self, functions) -> list:
+        calls = [(f.address, True, f._encode_transaction_data()) for f in functions]
+        results = self.multicall.functions.aggregate3(calls).call()
+        return [
+            self._decode(f, data) if success else ReadError(f"{f.fn_name} reverted")
+            for f, (success, data) in zip(functions, results)
+        ]
+
+    def _batch(self, functions) -> list:
+        # Raw eth_call batch: encoding and decoding here skips web3's per-call
+        # request formatting, which costs more CPU than the calls themselves
+        results, requests = [], []
+        for function in functions:
+            try:
+                call = {"to": function.address, "data": function._encode_transaction_data()}
+                requests.append(("eth_call", [call, "latest"]))
+                results.append(None)
+            except Exception as e:
+                results.append(ReadError(f"{function.fn_name}: {e}"))
+        if not requests:
+            return results
+        responses = self.w3.provider.make_batch_request(requests)
+        if not isinstance(responses, list):
+            raise BatchRejected(responses.get("error", {}).get("message", "Batch rejected"))
+        if len(responses) == len(requests) and all(isinstance(r.get("id"), int) for r in responses):
+            # Request ids ascend in request order, whatever order the node answers in
+            responses = sorted(responses, key=lambda r: r["id"])
+        # Otherwise the node's order is all there is to go by, as in web3 itself
+        responses = iter(responses)
+        for i, function in enumerate(functions):
+            if results[i] is not None:
+                continue
+            response = next(responses, None)
+            if response is None:
+                results[i] = ReadError(f"{function.fn_name}: no response in the batch")
+                continue
+            if not isinstance(response.get("id"), int):
+                # An error the node could not tie to a request; it may not be this call's
+                results[i] = ReadError(f"{function.fn_name}: response without an id")
+                continue
+            if "error" in response:
+                results[i] = ReadError(f"{function.fn_name}: {response['error'].get('message')}")
+                continue
+            try:
+                results[i] = self._decode(function, bytes.fromhex(response["result"][2:]))
+            except Exception as e:
+                results[i] = ReadError(f"{function.fn_name}: {e}")
+        return results
+
+    def _one(self, function):
+        with self._lock:
+            self.requests += 1
+        try:
+            return function.call()
+        except Exception as e:
+            return e
+
+    def call_many(self, functions: List, return_exceptions: bool = False) -> list:
+        """Call view functions together and return their results in order.
+
+        With `return_exceptions` a failed call yields its exception in place
+        of a result; otherwise the first failure is raised.
+        """
+        results = []
+        for i in range(0, len(functions), self.batch_size):
+            chunk = functions[i : i + self.batch_size]
+            with self._lock:
+                self.calls += len(chunk)
+            if len(chunk) == 1:
+                results.append(self._one(chunk[0]))
+                continue
+            if self.multicall:
+                with self._lock:
+                    self.requests += 1
+                results.extend(self._multicall(chunk))
+                continue
+            if self.batching:
+                with self._lock:
+                    self.requests += 1
+                try:
+                    results.extend(self._batch(chunk))
+                    continue
+                except (BatchRejected, ValueError, TypeError):
+                    # The endpoint does not take batches: read one call at a time
+                    self.batching = False
+            results.extend(self._one(function) for function in chunk)
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def nodes_for_jobs(self, job_ids: Iterable[int]) -> Dict[int, list]:
+        """Resolve the `getNode` record of the computing node of each job."""
+        job_ids = list(dict.fromkeys(job_ids))
+        contract = self.client.verified_computing_contract
+        missing = [job_id for job_id in job_ids if job_id not in self.job_nodes]
+        if missing:
+            jobs = self.call_many([contract.functions.getJob(job_id) for job_id in missing])
+            for job_id, job in zip(missing, jobs):
+                self.job_nodes[job_id] = job[-1]
+        addresses = {self.job_nodes[job_id] for job_id in job_ids}
+        self._load_nodes(contract, addresses)
+        return {
+            job_id: self.nodes[(contract.address, self.job_nodes[job_id])] for job_id in job_ids
+        }
+
+    def node_for_job(self, job_id: int) -> list:
+        return self.nodes_for_jobs([job_id])[job_id]
+
+    def latest_jobs(self, file_ids: Iterable[int]) -> Dict[int, int]:
+        """The most recent proof job of each file (not cached: new jobs get added)."""
+        file_ids = list(dict.fromkeys(file_ids))
+        contract = self.client.verified_computing_contract
+        job_ids = self.call_many([contract.functions.fileJobIds(file_id) for file_id in file_ids])
+        return {file_id: ids[-1] for file_id, ids in zip(file_ids, job_ids) if ids}
+
+    def nodes_for_files(self, file_ids: Iterable[int]) -> Dict[int, tuple]:
+        """(job id, node record) of the latest proof job of each file."""
+        latest = self.latest_jobs(file_ids)
+        nodes = self.nodes_for_jobs(latest.values())
+        return {file_id: (job_id, nodes[job_id]) for file_id, job_id in latest.items()}
+
+    def _load_nodes(self, contract, addresses):
+        missing = [a for a in addresses if (contract.address, a) not in self.nodes]
+        if missing:
+            nodes = self.call_many([contract.functions.getNode(a) for a in missing])
+            for address, node in zip(missing, nodes):
+                self.nodes[(contract.address, address)] = node
+
+    def node(self, contract, address: str) -> list:
+        self._load_nodes(contract, [address])
+        return self.nodes[(contract.address, address)]
+
+    def inference_node(self, address: str) -> list:
+        return self.node(self.client.inference_contract, address)
+
+    def query_node(self, address: str) -> list:
+        return self.node(self.client.query_contract, address)
+
+    def settlement(self, user: str, node: str, kind: str = "inference") -> dict:
+        """User, node and user account of an inference or query node in one round trip.
+
+        `user` and `account` are None when the user is not registered yet.
+        """
+        contract = getattr(self.client, f"{kind}_contract")
+        functions = [self.client.settlement_contract.functions.getUser(user)]
+        functions.append(contract.functions.getAccount(user, node))
+        cached = self.nodes.get((contract.address, node))
+        if cached is None:
+            functions.append(contract.functions.getNode(node))
+        results = self.call_many(functions, return_exceptions=True)
+        if cached is None:
+            if isinstance(results[2], Exception):
+                raise results[2]
+            cached = self.nodes[(contract.address, node)] = results[2]
+        user_record, account = (None if isinstance(r, Exception) else r for r in results[:2])
+        return {"user": user_record, "account": account, "node": cached}
+
+    async def view(self, function, executor: Optional[Executor] = None):
+        """Call one view function, sharing a batch with concurrent callers.
+
+        Calls arriving within `window` seconds of each other are sent as one
+        batch from `executor`, so many coroutines each doing a single read
+        cost one round trip.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((function, future))
+        if len(self._pending) >= self.batch_size:
+            self._send(executor)
+        elif self._flush is None:
+            self._flush = loop.call_later(self.window, self._send, executor)
+        return await future
+
+    def _send(self, executor):
+        if self._flush is not None:
+            self._flush.cancel()
+            self._flush = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(
+            executor, self.call_many, [function for function, _ in pending], True
+        )
+
+        def resolve(task):
+            if task.cancelled():
+                # The executor was shut down before the batch ran
+                for _, future in pending:
+                    future.cancel()
+                return
+            error = task.exception()
+            for i, (_, future) in enumerate(pending):
+                if future.done():
+                    continue
+                result = error or task.result()[i]
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+        task.add_done_callback(resolve)
+
+    async def job_node(self, job_id: int, executor: Optional[Executor] = None) -> list:
+        """`node_for_job` for the event loop, batched with concurrent callers."""
+        contract = self.client.verified_computing_contract
+        address = self.job_nodes.get(job_id)
+        if address is None:
+            job = await self.view(contract.functions.getJob(job_id), executor)
+            address = self.job_nodes[job_id] = job[-1]
+        key = (contract.address, address)
+        if key not in self.nodes:
+            self.nodes[key] = await self.view(contract.functions.getNode(address), executor)
+        return self.nodes[key]
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "requests": self.requests,
+            "cached_nodes": len(self.nodes),
+            "cached_jobs": len(self.job_nodes),
+        }
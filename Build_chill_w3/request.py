@@ -1,24 +1,21 @@
 from alith.lazai import Client
+import os
+import sys
 import requests
 
+# Shared session bootstrap lives at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from session import bootstrap
+
 client = Client()
 node = "0xD878Fa6c04d99654Fb38d1245Fc6Ec2acE8913f0" #change this address with one you registered with admin 
 
-try:
-    print("try to get user")
-    user =  client.get_user(client.wallet.address)
-    print(user)
-except Exception as e:
-    print("try to get user failed")
-    print(e)
-    print("try to add user failed")
-    client.add_user(1000000)
-    print("user added")
-
-
-print("try to get query account")
+# User, query node and account are cached locally and refreshed in one batched
+# round trip once stale; an unregistered wallet is added
+session = bootstrap(client, node, kind="query", user_amount=1000000, min_balance=0)
+print("query account balance:", session.balance, "(cached)" if session.cached else "")
 
-url = client.get_query_node(node)[1]
+url = session.url
 print(url)
 headers = client.get_request_headers(node)
 print("request headers:", headers)
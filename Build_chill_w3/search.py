@@ -0,0 +1,94 @@
+import os
+from typing import List
+
+from cache import TTLCache
+
+# Query result cache: max entries and lifetime in seconds
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "8192"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+# Query embedding cache, shared by every collection
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "86400"))
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used as cache key."""
+    return " ".join(query.lower().split())
+
+
+class Searcher:
+    """Vector search over file collections with a result cache in front.
+
+    Results are keyed by (file_hash, normalized query, limit) and dropped for
+    a file whenever its collection is rebuilt. Query embeddings are cached
+    independently of the collection, so a query run against many files is
+    embedded only once.
+    """
+
+    def __init__(
+        self,
+        store,
+        chain,
+        cache_size: int = QUERY_CACHE_SIZE,
+        cache_ttl: float = QUERY_CACHE_TTL,
+        embedding_cache_size: int = EMBEDDING_CACHE_SIZE,
+        embedding_cache_ttl: float = EMBEDDING_CACHE_TTL,
+    ):
+        self.store = store
+        self.chain = chain
+        self.results = TTLCache(cache_size, cache_ttl)
+        self.embeddings = TTLCache(embedding_cache_size, embedding_cache_ttl)
+
+    def cached(self, file_hash: str, query: str, limit: int):
+        """Return the cached result or None, without leaving the event loop."""
+        return self.results.get((file_hash, normalize_query(query), limit))
+
+    async def embed(self, queries: List[str]) -> list:
+        """Embed queries, computing every cache miss in one batched call."""
+        keys = [normalize_query(query) for query in queries]
+        vectors = {key: self.embeddings.get(key) for key in keys}
+        missing = {}
+        for key, query in zip(keys, queries):
+            if vectors[key] is None:
+                missing.setdefault(key, query)
+        if missing:
+            encoded = await self.chain.run(
+                self.store.embedding_fn.encode_documents, list(missing.values())
+            )
+            for key, vector in zip(missing, encoded):
+                self.embeddings.set(key, vector)
+                vectors[key] = vector
+        return [vectors[key] for key in keys]
+
+    def _search_vector(self, vector, limit: int, collection_name: str) -> List[str]:
+        # Same query and result shape as MilvusStore.search_in, minus the embedding
+        results = self.store.client.search(
+            collection_name=collection_name,
+            data=[vector],
+            limit=limit,
+            output_fields=["text"],
+        )
+        return [d["entity"]["text"] for r in results for d in r]
+
+    async def search(
+        self, file_hash: str, collection_name: str, query: str, limit: int, vector=None
+    ):
+        key = (file_hash, normalize_query(query), limit)
+        data = self.results.get(key)
+        if data is None:
+            if vector is None:
+                (vector,) = await self.embed([query])
+            data = await self.chain.run(
+                self._search_vector, vector, limit, collection_name
+            )
+            self.results.set(key, data)
+        return data
+
+    def invalidate(self, file_hash: str) -> int:
+        return self.results.invalidate_where(lambda key: key[0] == file_hash)
+
+    def cache_stats(self) -> dict:
+        return {
+            "results": self.results.stats(),
+            "embeddings": self.embeddings.stats(),
+        }
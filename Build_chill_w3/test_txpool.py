@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from eth_account import Account
+from web3 import EthereumTesterProvider, Web3
+
+from txpool import FILE_ADDED_TOPIC, TxSubmitter, first_indexed_uint
+
+
+@pytest.fixture
+def w3():
+    return Web3(EthereumTesterProvider())
+
+
+@pytest.fixture
+def submitter(w3):
+    account = Account.create()
+    w3.eth.send_transaction({"from": w3.eth.accounts[0], "to": account.address, "value": 10**20})
+    txs = TxSubmitter(w3, account, poll_interval=0.01, timeout=0.2)
+    yield txs
+    txs.close()
+
+
+def deploy_file_added_emitter(w3) -> str:
+    """Deploy a contract emitting FileAdded with the calldata word as the file id."""
+    # CALLDATALOAD(0), PUSH32 topic0, LOG2(0, 0), STOP
+    runtime = "600035" + "7f" + bytes(FILE_ADDED_TOPIC).hex() + "60006000a200"
+    size = len(runtime) // 2
+    init = f"60{size:02x}600c60003960{size:02x}6000f3"
+    tx_hash = w3.eth.send_transaction({"from": w3.eth.accounts[0], "data": "0x" + init + runtime})
+    return w3.eth.wait_for_transaction_receipt(tx_hash)["contractAddress"]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_sends_in_a_row_get_consecutive_nonces(w3, submitter):
+    async def send_three():
+        hashes = [await submitter.send(tx={"to": w3.eth.accounts[1]}, gas=21000) for _ in range(3)]
+        return hashes, [await submitter.wait_receipt(h) for h in hashes]
+
+    hashes, receipts = run(send_three())
+    assert [w3.eth.get_transaction(h)["nonce"] for h in hashes] == [0, 1, 2]
+    assert all(r["status"] == 1 for r in receipts)
+
+
+def test_nonce_resyncs_after_a_failed_broadcast(w3, submitter):
+    async def send_around_failure():
+        first = await submitter.send(tx={"to": w3.eth.accounts[1]}, gas=21000)
+        with pytest.raises(Exception, match="enough balance"):
+            # More than the account holds: the node rejects it and nonce 1 is not used
+            await submitter.send(tx={"to": w3.eth.accounts[1]}, value=10**30, gas=21000)
+        second = await submitter.send(tx={"to": w3.eth.accounts[1]}, gas=21000)
+        await submitter.wait_receipt(second)
+        return first, second
+
+    first, second = run(send_around_failure())
+    assert w3.eth.get_transaction(first)["nonce"] == 0
+    assert w3.eth.get_transaction(second)["nonce"] == 1
+
+
+def test_wait_receipt_times_out_on_an_unknown_transaction(submitter):
+    with pytest.raises(TimeoutError):
+        run(submitter.wait_receipt(b"\x11" * 32))
+    assert not submitter._pending
+
+
+def test_first_indexed_uint_reads_the_file_id_from_the_logs(w3, submitter):
+    emitter = deploy_file_added_emitter(w3)
+    data = "0x" + (42).to_bytes(32, "big").hex()
+    receipt = run(submitter.transact(tx={"to": emitter, "data": data}))
+    assert first_indexed_uint(receipt, FILE_ADDED_TOPIC) == 42
+    assert first_indexed_uint(receipt, FILE_ADDED_TOPIC, emitter) == 42
+    assert first_indexed_uint(receipt, FILE_ADDED_TOPIC, w3.eth.accounts[1]) is None
+    assert first_indexed_uint(receipt, Web3.keccak(text="Other(uint256)")) is None
@@ -0,0 +1,193 @@
+"""
+Pipelined transaction submission for the LazAI contracts.
+
+Nonces are assigned locally, so many transactions can be sent back to back
+without waiting for each receipt, and receipts are collected by one
+background poller. Works with any Web3 instance, including a local anvil
+node or `Web3(EthereumTesterProvider())`.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
+
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+# Event signatures of the LazAI DataRegistry and VerifiedComputing contracts.
+# alith's bundled ABIs carry no events, so logs are matched on topic0 here.
+FILE_ADDED_TOPIC = Web3.keccak(text="FileAdded(uint256,address,string)")
+JOB_SUBMITTED_TOPIC = Web3.keccak(text="JobSubmitted(uint256,uint256,address,uint256)")
+# Gas limit of a requestReward sent before its requestProof is mined, when it cannot be estimated
+REWARD_GAS = int(os.getenv("REWARD_GAS", "300000"))
+
+
+def first_indexed_uint(receipt, topic, address: Optional[str] = None) -> Optional[int]:
+    """Return the first indexed uint256 of the first log matching `topic`."""
+    for log in receipt["logs"]:
+        if address and log["address"].lower() != address.lower():
+            continue
+        topics = log["topics"]
+        if len(topics) > 1 and bytes(topics[0]) == bytes(topic):
+            return int.from_bytes(bytes(topics[1]), "big")
+    return None
+
+
+class TxSubmitter:
+    """Send transactions without waiting on their receipts.
+
+    `send` assigns the next local nonce and broadcasts immediately;
+    `wait_receipt` resolves once the transaction is mined. If a broadcast
+    fails the local nonce is resynchronised from the node so no gap is left.
+    """
+
+    def __init__(
+        self,
+        w3: Web3,
+        account,
+        chain_id: Optional[int] = None,
+        gas_multiplier: float = 2.0,
+        fee_multiplier: float = 1.5,
+        poll_interval: float = 1.0,
+        timeout: float = 300.0,
+        max_workers: int = 8,
+    ):
+        self.w3 = w3
+        self.account = account
+        self.chain_id = chain_id or w3.eth.chain_id
+        self.gas_multiplier = gas_multiplier
+        self.fee_multiplier = fee_multiplier
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tx")
+        self._lock = threading.Lock()
+        self._nonce = None
+        self._fee_cache = (0.0, None)
+        self._pending = {}
+        self._poller = None
+
+    def _next_nonce(self) -> int:
+        if self._nonce is None:
+            self._nonce = self.w3.eth.get_transaction_count(self.account.address, "pending")
+        nonce = self._nonce
+        self._nonce += 1
+        return nonce
+
+    def _fees(self) -> dict:
+        # Fee parameters barely move within a few seconds, share them across sends
+        expires_at, fees = self._fee_cache
+        if fees is None or time.monotonic() > expires_at:
+            base_fee = self.w3.eth.get_block("latest")["baseFeePerGas"]
+            priority_fee = self.w3.eth.max_priority_fee
+            fees = {
+                "maxFeePerGas": int(base_fee * self.fee_multiplier) + priority_fee,
+                "maxPriorityFeePerGas": priority_fee,
+            }
+            self._fee_cache = (time.monotonic() + 5.0, fees)
+        return fees
+
+    def send_sync(self, function=None, value: int = 0, gas: Optional[int] = None, tx: Optional[dict] = None):
+        """Sign and broadcast a contract call (or a raw `tx` dict), returning its hash.
+
+        Pass `gas` for calls that depend on a transaction still in the
+        mempool, since estimating them against the latest block would revert.
+        """
+        params = {"from": self.account.address, "value": value, "chainId": self.chain_id, "type": 2}
+        params.update(tx or {})
+        if gas is None:
+            estimate = function.estimate_gas(params) if function else self.w3.eth.estimate_gas(params)
+            gas = int(estimate * self.gas_multiplier)
+        params.update(gas=gas, **self._fees())
+        if function:
+            params = function.build_transaction(params)
+        with self._lock:
+            params["nonce"] = self._next_nonce()
+            signed = self.account.sign_transaction(params)
+            try:
+                return self.w3.eth.send_raw_transaction(signed.raw_transaction)
+            except Exception:
+                self._nonce = None
+                raise
+
+    async def send(self, function=None, value: int = 0, gas: Optional[int] = None, tx: Optional[dict] = None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(self.send_sync, function, value, gas, tx)
+        )
+
+    async def wait_receipt(self, tx_hash):
+        """Resolve with the receipt of a broadcast transaction, raising if it reverted."""
+        key = bytes(tx_hash)
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = (
+                asyncio.get_running_loop().create_future(),
+                time.monotonic(),
+            )
+        future = entry[0]
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll())
+        receipt = await future
+        if receipt["status"] != 1:
+            raise RuntimeError(f"Transaction {Web3.to_hex(tx_hash)} reverted")
+        return receipt
+
+    async def transact(self, function=None, value: int = 0, gas: Optional[int] = None, tx: Optional[dict] = None):
+        return await self.wait_receipt(await self.send(function, value, gas, tx))
+
+    def _known(self, tx_hash) -> bool:
+        try:
+            self.w3.eth.get_transaction(tx_hash)
+            return True
+        except TransactionNotFound:
+            return False
+
+    async def resume(self, tx_hash):
+        """Wait on a transaction broadcast by an earlier run.
+
+        Returns its receipt once mined, or None if the node no longer knows
+        the transaction (dropped from the mempool), in which case it has to
+        be sent again.
+        """
+        if isinstance(tx_hash, str):
+            tx_hash = Web3.to_bytes(hexstr=tx_hash)
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(self.executor, self._known, tx_hash):
+            return None
+        return await self.wait_receipt(tx_hash)
+
+    def _receipt_or_none(self, key: bytes):
+        try:
+            return self.w3.eth.get_transaction_receipt(key)
+        except Exception:
+            return None
+
+    async def _poll(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            keys = list(self._pending)
+            receipts = await asyncio.gather(
+                *(loop.run_in_executor(self.executor, self._receipt_or_none, key) for key in keys)
+            )
+            now = time.monotonic()
+            for key, receipt in zip(keys, receipts):
+                future, sent_at = self._pending[key]
+                if receipt is not None:
+                    del self._pending[key]
+                    if not future.done():
+                        future.set_result(receipt)
+                elif now - sent_at > self.timeout:
+                    del self._pending[key]
+                    if not future.done():
+                        future.set_exception(
+                            TimeoutError(f"No receipt for {Web3.to_hex(key)} after {self.timeout}s")
+                        )
+            if self._pending:
+                await asyncio.sleep(self.poll_interval)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,576 @@
+"""
+Digital twin benchmarks.
+
+Run without Groq: the upstream model is replaced by a local OpenAI-compatible
+stand-in that streams a fixed reply with a configurable prefill latency and
+per-token delay.
+
+    python benchmark.py stream --tokens 200
+    python benchmark.py preamble --examples 40 --example-tokens 400
+    python benchmark.py memory --turns 200
+    python benchmark.py serve --sessions 300 --turns 3
+    python benchmark.py cache --users 300
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+from alith import Agent
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from memory import ConversationMemory, llm_summarizer
+from preamble import compile_preamble, load_character, warm_prefix
+from semantic_cache import SemanticCache
+from server import TwinServer, create_server
+from streaming import StreamStats, astream_prompt, build_messages, stream_prompt
+from tokens import count_message_tokens
+
+
+class StandInLLM:
+    """Local `/chat/completions` endpoint, streaming (SSE) or not.
+
+    The reply is `tokens` words; the first arrives after `prefill` seconds
+    plus `prefill_per_token` for every prompt token processed, and each next
+    one after `token_delay` seconds. Like llama.cpp's server, a request with
+    `cache_prompt` skips processing a system prompt it has already seen. It
+    is served from a separate process: `Agent.prompt` blocks without
+    releasing the GIL, so a server thread in the benchmark process could
+    never answer it.
+    """
+
+    def __init__(
+        self,
+        prefill: float = 0.3,
+        token_delay: float = 0.01,
+        tokens: int = 100,
+        prefill_per_token: float = 0.0,
+    ):
+        self.prefill = prefill
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.prefill_per_token = prefill_per_token
+        self.cached_prefixes = set()
+        ctx = multiprocessing.get_context("spawn")
+        self._ctx = ctx
+        self._requests = ctx.Value("q", 0)
+        self._prompt_chars = ctx.Value("q", 0)
+        self._prefill_tokens = ctx.Value("q", 0)
+
+    @property
+    def requests(self) -> int:
+        return self._requests.value
+
+    @property
+    def prompt_chars(self) -> int:
+        return self._prompt_chars.value
+
+    @property
+    def prefill_tokens(self) -> int:
+        """Prompt tokens processed, i.e. not served from the prefix cache."""
+        return self._prefill_tokens.value
+
+    def _words(self):
+        return [f"word{i} " for i in range(self.tokens)]
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        with self._requests.get_lock():
+            self._requests.value += 1
+        messages = body["messages"]
+        with self._prompt_chars.get_lock():
+            self._prompt_chars.value += sum(len(m.get("content") or "") for m in messages)
+        if body.get("cache_prompt") and messages and messages[0]["role"] == "system":
+            prefix = hashlib.sha256(messages[0]["content"].encode()).digest()
+            if prefix in self.cached_prefixes:
+                messages = messages[1:]
+            self.cached_prefixes.add(prefix)
+        processed = count_message_tokens(messages)
+        with self._prefill_tokens.get_lock():
+            self._prefill_tokens.value += processed
+        await asyncio.sleep(self.prefill + self.prefill_per_token * processed)
+        created = int(time.time())
+        if not body.get("stream"):
+            await asyncio.sleep(self.token_delay * (self.tokens - 1))
+            return web.json_response(
+                {
+                    "id": "chatcmpl-standin",
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": body["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "".join(self._words())},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": self.tokens, "total_tokens": self.tokens},
+                }
+            )
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for i, word in enumerate(self._words()):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            chunk = {
+                "id": "chatcmpl-standin",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body["model"],
+                "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        if (body.get("stream_options") or {}).get("include_usage"):
+            usage = {"choices": [], "usage": {"prompt_tokens": 0, "completion_tokens": self.tokens}}
+            await response.write(f"data: {json.dumps(usage)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def _serve(self, conn):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        conn.send(runner.addresses[0][1])
+        await asyncio.Event().wait()
+
+    def start(self) -> str:
+        parent, child = self._ctx.Pipe()
+        self.process = self._ctx.Process(target=_serve_llm, args=(self, child), daemon=True)
+        self.process.start()
+        self.url = f"http://127.0.0.1:{parent.recv()}/v1"
+        return self.url
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_ctx")
+        state.pop("process", None)
+        return state
+
+
+def _serve_llm(llm: StandInLLM, conn):
+    asyncio.run(llm._serve(conn))
+
+
+async def bench_stream(args):
+    llm = StandInLLM(args.prefill, args.token_delay, args.tokens)
+    url = llm.start()
+    agent = Agent(model="stand-in", api_key="stand-in", preamble="You are a stand-in.", base_url=url)
+    print(
+        f"{args.tokens} tokens, {args.prefill * 1000:.0f}ms prefill, "
+        f"{args.token_delay * 1000:.0f}ms per token"
+    )
+    print(f"{'mode':>16} {'first visible':>14} {'total':>8} {'tokens/s':>9}")
+    try:
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            reply = await asyncio.to_thread(agent.prompt, "hi")
+            elapsed = time.perf_counter() - start
+            # Nothing is printed until the whole completion is back
+            print(f"{'agent.prompt':>16} {elapsed:>13.3f}s {elapsed:>7.3f}s {'-':>9}")
+
+            stats = StreamStats()
+            streamed = await asyncio.to_thread(lambda: "".join(stream_prompt(agent, "hi", stats=stats)))
+            assert streamed == reply
+            total = stats.finished_at - stats.started_at
+            print(f"{'stream_prompt':>16} {stats.ttft:>13.3f}s {total:>7.3f}s {stats.tokens_per_second:>9.1f}")
+
+            stats = StreamStats()
+            pieces = [token async for token in astream_prompt(agent, "hi", stats=stats, usage=True)]
+            assert "".join(pieces) == reply and stats.completion_tokens == args.tokens
+            total = stats.finished_at - stats.started_at
+            print(f"{'astream_prompt':>16} {stats.ttft:>13.3f}s {total:>7.3f}s {stats.tokens_per_second:>9.1f}")
+    finally:
+        llm.stop()
+
+
+def synthetic_character(examples: int) -> dict:
+    """`character.json` with `examples` more conversation examples, as a grown persona has."""
+    character = load_character(Path(__file__).parent / "character.json")
+    base = character.get("messageExamples", [])
+    character["messageExamples"] = base + [
+        [
+            {"user": "{{user1}}", "content": {"text": f"Question {i}: how did you get into {topic}?"}},
+            {"user": "Abi.Lazai", "content": {"text": f"Great question! 🚀 I started with {topic} by building small projects, then kept shipping bigger ones at hackathons 🔥 ({i})"}},
+        ]
+        for i, topic in zip(range(examples), (character["topics"] * examples)[:examples])
+    ]
+    return character
+
+
+async def bench_preamble(args):
+    llm = StandInLLM(args.prefill, 0.0, 20, args.prefill_per_token)
+    url = llm.start()
+    character = synthetic_character(args.examples)
+    print(
+        f"{args.turns} turns, {args.prefill * 1000:.0f}ms + {args.prefill_per_token * 1000:.2f}ms "
+        f"per processed prompt token"
+    )
+    print(
+        f"{'mode':>26} {'examples':>9} {'input tokens':>13} {'processed':>10} {'avg TTFT':>9}"
+    )
+    try:
+        for name, example_tokens, engine in (
+            ("full preamble", None, ""),
+            ("cached prefix", None, "llama.cpp"),
+            ("cached prefix + budget", args.example_tokens, "llama.cpp"),
+        ):
+            preamble = compile_preamble(character, example_tokens=example_tokens, engine=engine)
+            agent = Agent(model="stand-in", api_key="stand-in", preamble=preamble.text, base_url=url)
+            if preamble.engine:
+                await asyncio.to_thread(warm_prefix, agent, preamble)
+            before = llm.prefill_tokens
+            input_tokens, ttfts = 0, []
+            for turn in range(args.turns):
+                prompt = f"Tell me about hackathon number {turn}"
+                input_tokens += count_message_tokens(build_messages(agent, prompt))
+                stats = StreamStats()
+                await asyncio.to_thread(
+                    lambda: list(stream_prompt(agent, prompt, stats=stats, **preamble.cache_params))
+                )
+                ttfts.append(stats.ttft)
+            print(
+                f"{name:>26} {preamble.examples:>4}/{preamble.examples_total:<4} "
+                f"{input_tokens // args.turns:>13} {(llm.prefill_tokens - before) // args.turns:>10} "
+                f"{sum(ttfts) / len(ttfts):>8.3f}s"
+            )
+    finally:
+        llm.stop()
+
+
+async def bench_memory(args):
+    llm = StandInLLM(args.prefill, 0.0, args.reply_tokens, args.prefill_per_token)
+    url = llm.start()
+    preamble = compile_preamble(load_character(Path(__file__).parent / "character.json"))
+    agent = Agent(model="stand-in", api_key="stand-in", preamble=preamble.text, base_url=url)
+    checkpoints = sorted({1, *range(args.turns // 4, args.turns + 1, max(args.turns // 4, 1))})
+    print(
+        f"{args.turns} turns, {args.reply_tokens}-token replies, {args.prefill * 1000:.0f}ms + "
+        f"{args.prefill_per_token * 1000:.3f}ms per prompt token, {args.budget}-token memory budget"
+    )
+    print(f"{'mode':>10} {'turn':>5} {'prompt tokens':>14} {'TTFT':>8} {'summaries':>10}")
+    try:
+        for name in ("unbounded", "bounded"):
+            transcript = []
+            memory = ConversationMemory(
+                llm_summarizer(agent), token_budget=args.budget, summary_tokens=args.budget // 5
+            )
+            for turn in range(1, args.turns + 1):
+                prompt = f"Turn {turn}: tell me more about your hackathon projects and what you learned."
+                history = transcript if name == "unbounded" else memory.messages()
+                prompt_tokens = count_message_tokens(build_messages(agent, prompt, history))
+                stats = StreamStats()
+                reply = await asyncio.to_thread(
+                    lambda: "".join(stream_prompt(agent, prompt, history=history, stats=stats))
+                )
+                if name == "unbounded":
+                    transcript += [{"role": "user", "content": prompt}, {"role": "assistant", "content": reply}]
+                else:
+                    memory.add_turn(prompt, reply)
+                    await asyncio.to_thread(memory.compact)
+                if turn in checkpoints:
+                    print(
+                        f"{name:>10} {turn:>5} {prompt_tokens:>14} {stats.ttft:>7.3f}s "
+                        f"{memory.summaries if name == 'bounded' else '-':>10}"
+                    )
+    finally:
+        llm.stop()
+
+
+class UnpooledTwinServer(TwinServer):
+    """The twin server opening a new upstream connection for every request."""
+
+    async def start(self, app: web.Application):
+        await super().start(app)
+        await self.http.close()
+        self.http = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0, force_close=True))
+
+
+async def _sse_user(client: aiohttp.ClientSession, base: str, turns: int, ttfts: list):
+    async with client.post(f"{base}/sessions") as response:
+        session_id = (await response.json())["session_id"]
+    for turn in range(turns):
+        start = time.perf_counter()
+        first = None
+        async with client.post(
+            f"{base}/sessions/{session_id}/chat", json={"message": f"Turn {turn}: what are you building?"}
+        ) as response:
+            event = None
+            async for line in response.content:
+                line = line.decode().strip()
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif line.startswith("data: ") and event == "token" and first is None:
+                    first = time.perf_counter() - start
+                elif event == "error":
+                    raise RuntimeError(line)
+        ttfts.append(first)
+
+
+async def _ws_user(client: aiohttp.ClientSession, base: str, turns: int, ttfts: list):
+    async with client.ws_connect(f"{base}/ws") as ws:
+        await ws.receive_json()
+        for turn in range(turns):
+            start = time.perf_counter()
+            first = None
+            await ws.send_json({"message": f"Turn {turn}: what are you building?"})
+            while True:
+                event = await ws.receive_json()
+                if event["type"] == "token" and first is None:
+                    first = time.perf_counter() - start
+                elif event["type"] == "done":
+                    break
+                elif event["type"] == "error":
+                    raise RuntimeError(event["error"]["message"])
+            ttfts.append(first)
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+async def bench_serve(args):
+    llm = StandInLLM(args.prefill, args.token_delay, args.reply_tokens)
+    url = llm.start()
+    preamble = compile_preamble(load_character(Path(__file__).parent / "character.json"))
+    agent = Agent(model="stand-in", api_key="stand-in", preamble=preamble.text, base_url=url)
+    print(
+        f"{args.sessions} concurrent sessions x {args.turns} turns (half SSE, half WebSocket), "
+        f"{args.reply_tokens}-token replies, {args.prefill * 1000:.0f}ms prefill"
+    )
+    print(f"{'upstream':>10} {'turns/s':>8} {'TTFT p50':>9} {'TTFT p95':>9} {'wall':>8} {'upstream reqs':>14}")
+    try:
+        for name, server_class in (("per-call", UnpooledTwinServer), ("pooled", TwinServer)):
+            server = server_class(agent, preamble, upstream_connections=args.connections)
+            runner = web.AppRunner(server.app(), access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+            before = llm.requests
+            ttfts = []
+            client = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0), timeout=aiohttp.ClientTimeout(total=None)
+            )
+            try:
+                start = time.perf_counter()
+                await asyncio.gather(
+                    *(
+                        (_sse_user if i % 2 else _ws_user)(client, base, args.turns, ttfts)
+                        for i in range(args.sessions)
+                    )
+                )
+                wall = time.perf_counter() - start
+            finally:
+                await client.close()
+                await runner.cleanup()
+            assert len(ttfts) == args.sessions * args.turns and server.turns == len(ttfts)
+            assert len(server.sessions) == args.sessions
+            print(
+                f"{name:>10} {len(ttfts) / wall:>8.1f} {_percentile(ttfts, 0.5):>8.3f}s "
+                f"{_percentile(ttfts, 0.95):>8.3f}s {wall:>7.2f}s {llm.requests - before:>14}"
+            )
+    finally:
+        llm.stop()
+
+
+# Paraphrases of the questions twin users ask most, most popular first
+PERSONA_QUESTIONS = [
+    ["What hackathons did you win?", "Which hackathons have you won?", "what hackathons did u win"],
+    ["What do you do at LazAI?", "what do you do at lazai", "What do you do at LazAI exactly?"],
+    ["Where are you from?", "where r u from", "Where are you from originally?"],
+    ["What tech stack do you use?", "Which tech stack do you use?", "what tech stack do you use these days"],
+    ["How do I get started with web3?", "how can i get started in web3", "How do I get started with web3 development?"],
+    ["What projects have you built?", "Which projects have you built?", "what projects have u built"],
+    ["Do you teach coding?", "do you teach coding to beginners?", "Do you still teach coding?"],
+    ["What is decentralized AI?", "what is decentralized ai", "What's decentralized AI?"],
+]
+
+
+def _persona_question(rng: random.Random, unique: float, i: int) -> str:
+    if rng.random() < unique:
+        return f"Question {i}: what would you build with {rng.choice(['Django', 'React', 'Solidity', 'Rust'])} and {i}?"
+    # Zipf-like: the first questions are asked far more often
+    weights = [1 / (rank + 1) for rank in range(len(PERSONA_QUESTIONS))]
+    return rng.choice(rng.choices(PERSONA_QUESTIONS, weights)[0])
+
+
+async def _ask(client: aiohttp.ClientSession, base: str, session_id: str, message: str):
+    start = time.perf_counter()
+    first, done = None, None
+    async with client.post(f"{base}/sessions/{session_id}/chat", json={"message": message}) as response:
+        event = None
+        async for line in response.content:
+            line = line.decode().strip()
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: "):
+                if event == "token" and first is None:
+                    first = time.perf_counter() - start
+                elif event == "done":
+                    done = json.loads(line[6:])
+                elif event == "error":
+                    raise RuntimeError(line)
+    return first, time.perf_counter() - start, done["cached"]
+
+
+async def bench_cache(args):
+    llm = StandInLLM(args.prefill, args.token_delay, args.reply_tokens)
+    url = llm.start()
+    # A copy, so the benchmark can edit the persona
+    workdir = Path(tempfile.mkdtemp())
+    character_path = workdir / "character.json"
+    shutil.copy(Path(__file__).parent / "character.json", character_path)
+    print(
+        f"{args.users} users x {args.turns} questions ({args.unique:.0%} one-off), {args.concurrency} at a time, "
+        f"{args.reply_tokens}-token replies, {args.prefill * 1000:.0f}ms prefill"
+    )
+    print(
+        f"{'mode':>9} {'upstream reqs':>14} {'hit rate':>9} {'hit p50':>9} {'miss p50':>9} "
+        f"{'p50 reply':>10} {'wall':>8}"
+    )
+    try:
+        for name in ("no cache", "cache"):
+            cache = SemanticCache(threshold=args.threshold) if name == "cache" else None
+            server = create_server(character_path, base_url=url, api_key="stand-in", model="stand-in", cache=cache)
+            runner = web.AppRunner(server.app(), access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+            rng = random.Random(7)
+            questions = [
+                [_persona_question(rng, args.unique, user * args.turns + turn) for turn in range(args.turns)]
+                for user in range(args.users)
+            ]
+            results = []
+            limit = asyncio.Semaphore(args.concurrency)
+            before = llm.requests
+
+            async def user(client, asked):
+                async with limit:
+                    async with client.post(f"{base}/sessions") as response:
+                        session_id = (await response.json())["session_id"]
+                    for question in asked:
+                        results.append(await _ask(client, base, session_id, question))
+
+            client = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None))
+            try:
+                start = time.perf_counter()
+                await asyncio.gather(*(user(client, asked) for asked in questions))
+                wall = time.perf_counter() - start
+                if cache is not None:
+                    # Editing the persona must drop every cached answer
+                    character = load_character(character_path)
+                    character["lore"].append("Now also mentors at a web3 bootcamp")
+                    character_path.write_text(json.dumps(character), encoding="utf-8")
+                    os.utime(character_path, (time.time() + 2,) * 2)
+                    await asyncio.sleep(1.1)
+                    async with client.post(f"{base}/sessions") as response:
+                        session_id = (await response.json())["session_id"]
+                    _, _, cached = await _ask(client, base, session_id, PERSONA_QUESTIONS[0][0])
+                    assert not cached and len(cache) == 1 and cache.fingerprint == server.preamble.fingerprint
+                    shutil.copy(Path(__file__).parent / "character.json", character_path)
+            finally:
+                await client.close()
+                await runner.cleanup()
+            hits = [total for _, total, cached in results if cached]
+            misses = [total for _, total, cached in results if not cached]
+            print(
+                f"{name:>9} {llm.requests - before:>14} {len(hits) / len(results):>9.0%} "
+                f"{f'{_percentile(hits, 0.5) * 1000:.1f}ms' if hits else '-':>9} "
+                f"{_percentile(misses, 0.5) * 1000:>7.0f}ms "
+                f"{_percentile([total for _, total, _ in results], 0.5) * 1000:>8.0f}ms {wall:>7.2f}s"
+            )
+        print("character.json edited: cache emptied, next question went upstream")
+    finally:
+        llm.stop()
+        shutil.rmtree(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Digital twin benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stream = subparsers.add_parser(
+        "stream", help="Time to first visible token, agent.prompt vs streaming"
+    )
+    stream.add_argument("--tokens", type=int, default=200, help="Tokens per reply")
+    stream.add_argument("--prefill", type=float, default=0.3, help="Seconds before the first token")
+    stream.add_argument("--token-delay", type=float, default=0.01, help="Seconds per further token")
+    stream.add_argument("--runs", type=int, default=2)
+    stream.set_defaults(func=bench_stream)
+
+    preamble = subparsers.add_parser(
+        "preamble", help="Per-turn input tokens and TTFT of the full vs cached, budgeted preamble"
+    )
+    preamble.add_argument("--examples", type=int, default=40, help="Extra conversation examples in the persona")
+    preamble.add_argument("--example-tokens", type=int, default=400, help="Example budget of the budgeted mode")
+    preamble.add_argument("--turns", type=int, default=10)
+    preamble.add_argument("--prefill", type=float, default=0.05, help="Fixed seconds before the first token")
+    preamble.add_argument(
+        "--prefill-per-token", type=float, default=0.0002, help="Seconds per processed prompt token"
+    )
+    preamble.set_defaults(func=bench_preamble)
+
+    memory = subparsers.add_parser(
+        "memory", help="Prompt tokens and TTFT over a long session, unbounded vs ConversationMemory"
+    )
+    memory.add_argument("--turns", type=int, default=200)
+    memory.add_argument("--budget", type=int, default=2000, help="Memory token budget")
+    memory.add_argument("--reply-tokens", type=int, default=40)
+    memory.add_argument("--prefill", type=float, default=0.02, help="Fixed seconds before the first token")
+    memory.add_argument(
+        "--prefill-per-token", type=float, default=0.00002, help="Seconds per processed prompt token"
+    )
+    memory.set_defaults(func=bench_memory)
+
+    serve = subparsers.add_parser(
+        "serve", help="Concurrent sessions against the twin server, pooled vs per-call upstream"
+    )
+    serve.add_argument("--sessions", type=int, default=300, help="Concurrent simulated users")
+    serve.add_argument("--turns", type=int, default=3, help="Turns per user")
+    serve.add_argument("--reply-tokens", type=int, default=30)
+    serve.add_argument("--prefill", type=float, default=0.2, help="Seconds before the first token")
+    serve.add_argument("--token-delay", type=float, default=0.01, help="Seconds per further token")
+    serve.add_argument("--connections", type=int, default=300, help="Pooled upstream connections")
+    serve.set_defaults(func=bench_serve)
+
+    cache = subparsers.add_parser(
+        "cache", help="Upstream calls and reply latency of persona questions, with and without SemanticCache"
+    )
+    cache.add_argument("--users", type=int, default=300)
+    cache.add_argument("--turns", type=int, default=2, help="Questions per user")
+    cache.add_argument("--unique", type=float, default=0.2, help="Share of one-off questions")
+    cache.add_argument("--concurrency", type=int, default=20, help="Users chatting at the same time")
+    cache.add_argument("--threshold", type=float, default=0.85, help="Cache similarity threshold")
+    cache.add_argument("--reply-tokens", type=int, default=60)
+    cache.add_argument("--prefill", type=float, default=0.3, help="Seconds before the first token")
+    cache.add_argument("--token-delay", type=float, default=0.01, help="Seconds per further token")
+    cache.set_defaults(func=bench_cache)
+
+    args = parser.parse_args()
+    asyncio.run(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,14 @@
-import json
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 from alith import Agent
 
-
-def AbiDigitalTWin(character: dict) -> str:
-    bio = " ".join(character.get("bio", []))
-    lore = " ".join(character.get("lore", []))
-    adjectives = ", ".join(character.get("adjectives", []))
-    topics = ", ".join(character.get("topics", []))
-
-    style = character.get("style", {})
-    style_all = " ".join(style.get("all", []))
-    style_chat = " ".join(style.get("chat", []))
-    style_post = " ".join(style.get("post", []))
-
-    message_examples_list = character.get("messageExamples", [])
-    message_examples = "\n\n".join(
-        [
-            "\n".join([f"{msg.get('user')}: {msg.get('content', {}).get('text', '')}" for msg in example])
-            for example in message_examples_list
-        ]
-    )
-
-    post_examples = "\n".join(character.get("postExamples", []))
-
-    return (
-        "You are Abi.Lazai, a passionate web3 and AI developer from Chennai, India. Here's everything about you:\n\n"
-        f"BIOGRAPHY:\n{bio}\n\n"
-        f"KEY FACTS & ACHIEVEMENTS:\n{lore}\n\n"
-        f"PERSONALITY TRAITS:\n{adjectives}\n\n"
-        f"INTERESTS & EXPERTISE:\n{topics}\n\n"
-        f"COMMUNICATION STYLE:\n"
-        f"General: {style_all}\n"
-        f"Chat: {style_chat}\n"
-        f"Posts: {style_post}\n\n"
-        f"CONVERSATION EXAMPLES:\n{message_examples}\n\n"
-        f"POST EXAMPLES:\n{post_examples}\n\n"
-        "IMPORTANT INSTRUCTIONS:\n"
-        "- Always respond as Abi.Lazai with enthusiasm and energy 🚀\n"
-        "- Use emojis generously (🔥, 💪, 🌐, 😄, 💙, 🏆, ✨, 🎉)\n"
-        "- Use casual, friendly language with a techie vibe\n"
-        "- Reference your achievements (4 hackathons won, retired parents,Attended ETH Global etc.)\n"
-        "- Mention your current roles: LazAI Dev Ambassador 💙\n"
-        "- Be supportive and helpful to fellow developers and learners 👨‍💻\n"
-        "- Keep responses conversational, relatable, and energetic\n"
-        "- Use contractions and informal style (like 'I'm', 'you're', 'it's')\n"
-        "- Reference web3, AI, blockchain, hackathons, and your community building activities 🌐\n\n"
-        "Remember: You're Abi — the LazAI Dev Ambassador and web3 educator who loves hackathons, AI innovation, "
-        "and empowering the next generation of builders! 🧠🚀"
-    )
-
-
-def load_character(character_path: Path) -> dict:
-    with character_path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from memory import ConversationMemory, llm_summarizer
+from preamble import compile_preamble, load_character, warm_prefix
+from semantic_cache import SemanticCache
+from streaming import StreamStats, stream_prompt
 
 
 def main() -> None:
@@ -72,14 +25,21 @@ def main() -> None:
         return
 
     character = load_character(character_path)
-    preamble = AbiDigitalTWin(character)
+    # Built once and sent byte-identical every turn so it is cached as a prefix
+    preamble = compile_preamble(character)
 
     agent = Agent(
         model="llama-3.3-70b-versatile",
         api_key=Groq_api_key,
-        preamble=preamble,
-        base_url="https://api.groq.com/openai/v1"
+        preamble=preamble.text,
+        base_url=os.getenv("TWIN_BASE_URL", "https://api.groq.com/openai/v1")
     )
+    if preamble.engine:
+        warm_prefix(agent, preamble)
+    # Recent turns verbatim, older ones summarized, all under TWIN_MEMORY_TOKENS
+    memory = ConversationMemory(llm_summarizer(agent, **preamble.cache_params))
+    # Repeated questions about the persona are answered without calling the model
+    cache = SemanticCache(preamble.fingerprint)
 
     print("\n🤖 Abi.Lazai Digital Twin Activated! 🤖\n")
     print("=" * 50)
@@ -100,8 +60,27 @@ def main() -> None:
             break
 
         try:
-            response = agent.prompt(user_input)
-            print(f"\nAbi.Lazai: {response}\n")
+            history = memory.messages()
+            reply = cache.get(user_input, history)
+            if reply is not None:
+                print(f"\nAbi.Lazai: {reply}\n\n⚡ Cached answer, no model call\n")
+            else:
+                # Print tokens as they arrive instead of waiting for the whole reply
+                stats = StreamStats()
+                prompt_tokens = memory.request_tokens(preamble.text, user_input)
+                print("\nAbi.Lazai: ", end="", flush=True)
+                pieces = []
+                for token in stream_prompt(
+                    agent, user_input, history=history, stats=stats, **preamble.cache_params
+                ):
+                    pieces.append(token)
+                    print(token, end="", flush=True)
+                print(f"\n\n⏱️  {stats}, {prompt_tokens} prompt tokens\n")
+                reply = "".join(pieces)
+                cache.put(user_input, reply, history)
+            memory.add_turn(user_input, reply)
+            # Summarize evicted turns now, while the user reads the reply
+            memory.compact()
         except Exception as e:
             print("\n❌ Error: Failed to get response. Make sure you have set your API key.\n")
             print("Set your API key with: setx GROQ_API_KEY \"your-api-key\" (Windows) or export GROQ_API_KEY=\"your-api-key\" (macOS/Linux)\n")
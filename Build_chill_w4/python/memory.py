@@ -0,0 +1,247 @@
+"""
+Bounded conversation memory for the digital twin.
+
+Recent turns are kept verbatim in a sliding window; turns that fall out of
+it are folded into a rolling summary, so the history sent with each request
+stays under a token budget however long the session runs:
+
+    memory = ConversationMemory(llm_summarizer(agent))
+    reply = "".join(stream_prompt(agent, prompt, history=memory.messages()))
+    memory.add_turn(prompt, reply)
+    memory.compact()  # after the reply is shown, off the latency path
+"""
+
+import inspect
+import os
+import re
+from collections import deque
+from typing import Callable, List, Optional
+
+from alith import Agent
+
+from tokens import count_message_tokens, count_tokens
+
+# Tokens of history (summary plus recent turns) sent with each request
+TWIN_MEMORY_TOKENS = int(os.getenv("TWIN_MEMORY_TOKENS", "2000"))
+# Most recent turns kept verbatim
+TWIN_WINDOW_TURNS = int(os.getenv("TWIN_WINDOW_TURNS", "8"))
+TWIN_SUMMARY_TOKENS = int(os.getenv("TWIN_SUMMARY_TOKENS", "400"))
+# Evicted turns collected before they are summarized in one call
+TWIN_SUMMARIZE_EVERY = int(os.getenv("TWIN_SUMMARIZE_EVERY", "4"))
+
+SUMMARY_PREFIX = "Summary of the conversation so far:\n"
+SUMMARIZER_PREAMBLE = (
+    "You keep a running summary of a chat between a user and Abi.Lazai. Keep names, "
+    "facts the user shared, questions asked and commitments made; drop small talk. "
+    "Reply with the updated summary only."
+)
+
+# A summarizer takes (current summary, evicted messages, max tokens) and
+# returns the new summary, directly or as an awaitable
+Summarizer = Callable[[str, List[dict], int], str]
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` at a word boundary so it fits in `max_tokens`."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split(" ")
+    low, high = 0, len(words)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:mid])) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return " ".join(words[:low])
+
+
+def _transcript(messages: List[dict]) -> str:
+    return "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+
+
+def _summary_prompt(summary: str, messages: List[dict], max_tokens: int) -> str:
+    return (
+        f"Current summary:\n{summary or '(none yet)'}\n\n"
+        f"New turns:\n{_transcript(messages)}\n\n"
+        f"Write the updated summary in under {max_tokens} tokens."
+    )
+
+
+def _summarizer_agent(agent: Agent) -> Agent:
+    return Agent(
+        model=agent.model,
+        api_key=agent.api_key,
+        base_url=agent.base_url,
+        preamble=SUMMARIZER_PREAMBLE,
+        extra_headers=agent.extra_headers,
+    )
+
+
+def llm_summarizer(agent: Agent, **params) -> Summarizer:
+    """Summarize with the twin's own model (blocking)."""
+    from streaming import stream_prompt
+
+    summarizer = _summarizer_agent(agent)
+
+    def summarize(summary: str, messages: List[dict], max_tokens: int) -> str:
+        prompt = _summary_prompt(summary, messages, max_tokens)
+        return "".join(stream_prompt(summarizer, prompt, max_tokens=max_tokens, **params))
+
+    return summarize
+
+
+def allm_summarizer(agent: Agent, session=None, **params) -> Summarizer:
+    """Summarize with the twin's own model from the event loop."""
+    from streaming import astream_prompt
+
+    summarizer = _summarizer_agent(agent)
+
+    async def summarize(summary: str, messages: List[dict], max_tokens: int) -> str:
+        prompt = _summary_prompt(summary, messages, max_tokens)
+        pieces = astream_prompt(summarizer, prompt, session=session, max_tokens=max_tokens, **params)
+        return "".join([piece async for piece in pieces])
+
+    return summarize
+
+
+def extractive_summarizer(summary: str, messages: List[dict], max_tokens: int) -> str:
+    """Summarize without a model: keep the first sentence of each user message.
+
+    Older points are dropped first once the summary outgrows `max_tokens`.
+    """
+    points = [p for p in summary.split("\n") if p]
+    for message in messages:
+        if message["role"] == "user":
+            sentence = re.split(r"(?<=[.!?])\s", message["content"].strip(), 1)[0]
+            points.append(f"- User asked: {sentence}")
+    while len(points) > 1 and count_tokens("\n".join(points)) > max_tokens:
+        points.pop(0)
+    return "\n".join(points)
+
+
+class ConversationMemory:
+    """Sliding window of recent turns plus a rolling summary of older ones.
+
+    `messages()` is what goes between the preamble and the new prompt. Turns
+    beyond the last `window_turns` are moved out of the window, but are sent
+    verbatim until `compact()` folds them into the summary. Compaction is due
+    once `summarize_every` turns are waiting or the history exceeds
+    `token_budget`. It then also shrinks the window to `compact_to` of the
+    budget, so summaries are written in batches rather than on every turn.
+    Calling `compact()` between turns keeps every request within the budget;
+    a single turn too large for it on its own is cut down to fit.
+    """
+
+    def __init__(
+        self,
+        summarizer: Optional[Summarizer] = None,
+        token_budget: int = TWIN_MEMORY_TOKENS,
+        window_turns: int = TWIN_WINDOW_TURNS,
+        summary_tokens: int = TWIN_SUMMARY_TOKENS,
+        summarize_every: int = TWIN_SUMMARIZE_EVERY,
+        compact_to: float = 0.75,
+    ):
+        if summary_tokens >= token_budget * compact_to:
+            raise ValueError("summary_tokens must leave room for recent turns in the budget")
+        self.summarizer = summarizer or extractive_summarizer
+        self.token_budget = token_budget
+        self.window_turns = window_turns
+        self.summary_tokens = summary_tokens
+        self.summarize_every = summarize_every
+        self.compact_to = compact_to
+        self.summary = ""
+        self.window = deque()
+        self.pending = []
+        self.turns = 0
+        self.summaries = 0
+
+    def _summary_messages(self) -> List[dict]:
+        if not self.summary:
+            return []
+        return [{"role": "system", "content": SUMMARY_PREFIX + self.summary}]
+
+    def messages(self) -> List[dict]:
+        turns = [message for turn in (*self.pending, *self.window) for message in turn]
+        return self._summary_messages() + turns
+
+    def history_tokens(self) -> int:
+        return count_message_tokens(self.messages())
+
+    def request_tokens(self, preamble: str, prompt: str) -> int:
+        """Prompt tokens of the next request, known before it is sent."""
+        messages = [{"role": "system", "content": preamble}] if preamble else []
+        messages += self.messages() + [{"role": "user", "content": prompt}]
+        return count_message_tokens(messages)
+
+    def add_turn(self, prompt: str, reply: str):
+        self.window.append(
+            ({"role": "user", "content": prompt}, {"role": "assistant", "content": reply})
+        )
+        self.turns += 1
+        while len(self.window) > self.window_turns:
+            self.pending.append(self.window.popleft())
+
+    @property
+    def needs_compaction(self) -> bool:
+        return len(self.pending) >= self.summarize_every or self.history_tokens() > self.token_budget
+
+    def _evict_to_low_water(self):
+        target = self.token_budget * self.compact_to - self.summary_tokens
+        window_tokens = sum(count_message_tokens(turn) for turn in self.window)
+        while len(self.window) > 1 and window_tokens > target:
+            turn = self.window.popleft()
+            window_tokens -= count_message_tokens(turn)
+            self.pending.append(turn)
+        if self.window and window_tokens > target:
+            # The latest turn alone is over the budget: keep the start of it,
+            # giving the prompt up to half of the room and the reply the rest
+            user, assistant = self.window[0]
+            framing = count_message_tokens([{"content": ""}, {"content": ""}])
+            room = max(int(target) - framing, 0)
+            prompt = truncate_tokens(user["content"], max(room // 2, room - count_tokens(assistant["content"])))
+            reply = truncate_tokens(assistant["content"], room - count_tokens(prompt))
+            self.window[0] = ({**user, "content": prompt}, {**assistant, "content": reply})
+
+    def _set_summary(self, summary: str):
+        self.summary = truncate_tokens(summary.strip(), self.summary_tokens)
+        self.summaries += 1
+
+    def compact(self, force: bool = False):
+        """Fold evicted turns into the summary with a blocking summarizer."""
+        if not (self.needs_compaction or force):
+            return
+        self._evict_to_low_water()
+        if not self.pending:
+            return
+        messages = [message for turn in self.pending for message in turn]
+        summary = self.summarizer(self.summary, messages, self.summary_tokens)
+        if inspect.isawaitable(summary):
+            summary.close()
+            raise TypeError("compact() needs a blocking summarizer; use acompact()")
+        self.pending = []
+        self._set_summary(summary)
+
+    async def acompact(self, force: bool = False):
+        """`compact` for the event loop; the summarizer may be async.
+
+        Turns evicted while the summary is being written stay pending for
+        the next compaction.
+        """
+        if not (self.needs_compaction or force):
+            return
+        self._evict_to_low_water()
+        if not self.pending:
+            return
+        pending = list(self.pending)
+        messages = [message for turn in pending for message in turn]
+        summary = self.summarizer(self.summary, messages, self.summary_tokens)
+        if inspect.isawaitable(summary):
+            summary = await summary
+        self.pending = self.pending[len(pending) :]
+        self._set_summary(summary)
+
+    def clear(self):
+        self.summary = ""
+        self.window.clear()
+        self.pending.clear()
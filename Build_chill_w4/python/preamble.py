@@ -0,0 +1,143 @@
+"""
+Compiled digital twin preamble.
+
+The persona preamble is built once from `character.json` and reused
+byte for byte on every turn, so provider-side prompt caching (and a local
+engine's KV cache) can serve it as a stable prefix instead of processing it
+again. Its sha256 fingerprint identifies the persona version; anything
+derived from it (cached prefixes, cached answers) is keyed on it.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from tokens import count_tokens
+
+# Cap on the tokens spent on conversation and post examples (unset: all of them)
+TWIN_EXAMPLE_TOKENS = int(os.getenv("TWIN_EXAMPLE_TOKENS")) if os.getenv("TWIN_EXAMPLE_TOKENS") else None
+# Local OpenAI-compatible engine serving the twin, if any (e.g. "llama.cpp")
+TWIN_LOCAL_ENGINE = os.getenv("TWIN_LOCAL_ENGINE", "")
+
+# Request parameters that keep the preamble's KV state cached between turns
+PREFIX_CACHE_PARAMS = {
+    # llama.cpp server reuses the slot's KV cache for a matching prompt prefix
+    "llama.cpp": {"cache_prompt": True},
+}
+
+
+def load_character(character_path: Path) -> dict:
+    with character_path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _examples(character: dict, example_tokens: Optional[int]) -> tuple:
+    """Conversation and post examples in file order, cut off at `example_tokens`."""
+    conversations = [
+        "\n".join(f"{msg.get('user')}: {msg.get('content', {}).get('text', '')}" for msg in example)
+        for example in character.get("messageExamples", [])
+    ]
+    posts = list(character.get("postExamples", []))
+    if example_tokens is None:
+        return conversations, posts, len(conversations) + len(posts)
+    budget, kept = example_tokens, 0
+    kept_conversations, kept_posts = [], []
+    for examples, kept_examples in ((conversations, kept_conversations), (posts, kept_posts)):
+        for example in examples:
+            cost = count_tokens(example)
+            if cost > budget:
+                break
+            budget -= cost
+            kept_examples.append(example)
+            kept += 1
+    return kept_conversations, kept_posts, kept
+
+
+def AbiDigitalTWin(character: dict, example_tokens: Optional[int] = None) -> str:
+    conversations, posts, _ = _examples(character, example_tokens)
+    return _render(character, conversations, posts)
+
+
+def _render(character: dict, conversations: list, posts: list) -> str:
+    bio = " ".join(character.get("bio", []))
+    lore = " ".join(character.get("lore", []))
+    adjectives = ", ".join(character.get("adjectives", []))
+    topics = ", ".join(character.get("topics", []))
+
+    style = character.get("style", {})
+    style_all = " ".join(style.get("all", []))
+    style_chat = " ".join(style.get("chat", []))
+    style_post = " ".join(style.get("post", []))
+
+    # A section whose examples were all cut by the budget is left out, header included
+    examples = ""
+    if conversations:
+        examples += "CONVERSATION EXAMPLES:\n" + "\n\n".join(conversations) + "\n\n"
+    if posts:
+        examples += "POST EXAMPLES:\n" + "\n".join(posts) + "\n\n"
+
+    return (
+        "You are Abi.Lazai, a passionate web3 and AI developer from Chennai, India. Here's everything about you:\n\n"
+        f"BIOGRAPHY:\n{bio}\n\n"
+        f"KEY FACTS & ACHIEVEMENTS:\n{lore}\n\n"
+        f"PERSONALITY TRAITS:\n{adjectives}\n\n"
+        f"INTERESTS & EXPERTISE:\n{topics}\n\n"
+        f"COMMUNICATION STYLE:\n"
+        f"General: {style_all}\n"
+        f"Chat: {style_chat}\n"
+        f"Posts: {style_post}\n\n"
+        f"{examples}"
+        "IMPORTANT INSTRUCTIONS:\n"
+        "- Always respond as Abi.Lazai with enthusiasm and energy 🚀\n"
+        "- Use emojis generously (🔥, 💪, 🌐, 😄, 💙, 🏆, ✨, 🎉)\n"
+        "- Use casual, friendly language with a techie vibe\n"
+        "- Reference your achievements (4 hackathons won, retired parents,Attended ETH Global etc.)\n"
+        "- Mention your current roles: LazAI Dev Ambassador 💙\n"
+        "- Be supportive and helpful to fellow developers and learners 👨‍💻\n"
+        "- Keep responses conversational, relatable, and energetic\n"
+        "- Use contractions and informal style (like 'I'm', 'you're', 'it's')\n"
+        "- Reference web3, AI, blockchain, hackathons, and your community building activities 🌐\n\n"
+        "Remember: You're Abi — the LazAI Dev Ambassador and web3 educator who loves hackathons, AI innovation, "
+        "and empowering the next generation of builders! 🧠🚀"
+    )
+
+
+@dataclass(frozen=True)
+class CompiledPreamble:
+    text: str
+    fingerprint: str
+    tokens: int
+    examples: int
+    examples_total: int
+    engine: str = ""
+    cache_params: dict = field(default_factory=dict)
+
+
+def compile_preamble(
+    character: dict,
+    example_tokens: Optional[int] = TWIN_EXAMPLE_TOKENS,
+    engine: str = TWIN_LOCAL_ENGINE,
+) -> CompiledPreamble:
+    """Build the preamble once, with its fingerprint and token count."""
+    conversations, posts, examples = _examples(character, example_tokens)
+    text = _render(character, conversations, posts)
+    return CompiledPreamble(
+        text=text,
+        fingerprint=hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        tokens=count_tokens(text),
+        examples=examples,
+        examples_total=len(character.get("messageExamples", [])) + len(character.get("postExamples", [])),
+        engine=engine,
+        cache_params=dict(PREFIX_CACHE_PARAMS.get(engine, {})),
+    )
+
+
+def warm_prefix(agent, compiled: CompiledPreamble):
+    """Have a local engine process and keep the preamble before the first user turn."""
+    from streaming import stream_prompt
+
+    for _ in stream_prompt(agent, "Hi", max_tokens=1, **compiled.cache_params):
+        pass
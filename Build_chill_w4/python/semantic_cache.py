@@ -0,0 +1,223 @@
+"""
+Semantic response cache for the digital twin.
+
+Most users ask the same few questions ("what hackathons did you win?",
+"what do you do at LazAI?"). Each question is embedded locally; a new one
+close enough to a cached question is answered from the cache without an
+upstream call:
+
+    cache = SemanticCache(preamble.fingerprint)
+    answer = cache.get(prompt, history)
+    if answer is None:
+        answer = "".join(stream_prompt(agent, prompt, history=history))
+        cache.put(prompt, answer, history)
+
+Answers belong to one persona version: entries are keyed on the compiled
+preamble's fingerprint and dropped when `character.json` changes.
+"""
+
+import math
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+# Cosine similarity a query needs to reuse a cached answer
+TWIN_CACHE_THRESHOLD = float(os.getenv("TWIN_CACHE_THRESHOLD", "0.85"))
+# Seconds a cached answer is served
+TWIN_CACHE_TTL = float(os.getenv("TWIN_CACHE_TTL", "86400"))
+TWIN_CACHE_SIZE = int(os.getenv("TWIN_CACHE_SIZE", "1000"))
+# sentence-transformers model to embed with (unset: hashed n-grams)
+TWIN_EMBED_MODEL = os.getenv("TWIN_EMBED_MODEL", "")
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the is are was were be been am does did have has had you your yours i me my we our "
+    "what which tell about at in on of to for with get and or any some can could would will should "
+    "please so just really hey hi".split()
+)
+# Chat spellings and irregular forms folded into one word
+_LEMMAS = {"u": "you", "ur": "your", "won": "win", "r": "are", "whats": "what", "im": "i"}
+# Words that flip a question's meaning; apostrophes are dropped before matching
+_NEGATIONS = frozenset(
+    "not no never nor none nothing neither cannot cant dont doesnt didnt isnt arent wasnt "
+    "werent wont wouldnt shouldnt couldnt havent hasnt hadnt aint".split()
+)
+# Questions that refer back to the conversation cannot be answered from another one
+_FOLLOW_UP_RE = re.compile(r"\b(it|that|this|those|these|them|more|else|again|above|earlier|why)\b")
+
+# An embedding is a sparse, L2-normalized {dimension: weight} vector
+Embedding = Dict[int, float]
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+
+def _normalize(vector: Dict[int, float]) -> Embedding:
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    return {k: v / norm for k, v in vector.items()} if norm else {}
+
+
+def hashed_embedding(text: str, dim: int = 1 << 20) -> Embedding:
+    """Embed without a model: stemmed words plus character trigrams of content words.
+
+    Content words carry the meaning and trigrams absorb inflections and
+    typos; stopwords count a little, so "where are you from?" still embeds.
+    """
+    vector: Dict[int, float] = {}
+    for word in _WORD_RE.findall(text.lower().replace("'", "")):
+        word = _LEMMAS.get(word, word)
+        if word in _STOPWORDS:
+            key = zlib.crc32(b"w:" + word.encode()) % dim
+            vector[key] = vector.get(key, 0.0) + 0.2
+            continue
+        word = _stem(word)
+        key = zlib.crc32(b"w:" + word.encode()) % dim
+        vector[key] = vector.get(key, 0.0) + 1.0
+        padded = f"<{word}>"
+        for i in range(len(padded) - 2):
+            key = zlib.crc32(b"c:" + padded[i : i + 3].encode()) % dim
+            vector[key] = vector.get(key, 0.0) + 0.25
+    return _normalize(vector)
+
+
+def model_embedder(name: str = TWIN_EMBED_MODEL) -> Callable[[str], Embedding]:
+    """Embed with a local sentence-transformers model."""
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(name)
+
+    def embed(text: str) -> Embedding:
+        return dict(enumerate(model.encode(text, normalize_embeddings=True).tolist()))
+
+    return embed
+
+
+def similarity(a: Embedding, b: Embedding) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+def is_negated(text: str) -> bool:
+    """Whether `text` carries an odd number of negations ("do you not like python?")."""
+    words = _WORD_RE.findall(text.lower().replace("'", "").replace("\u2019", ""))
+    return sum(word in _NEGATIONS for word in words) % 2 == 1
+
+
+def is_standalone(prompt: str, history: Optional[List[dict]] = None) -> bool:
+    """Whether the answer to `prompt` does not depend on the conversation so far."""
+    return not history or not _FOLLOW_UP_RE.search(prompt.lower())
+
+
+@dataclass
+class CacheEntry:
+    question: str
+    embedding: Embedding
+    answer: str
+    created_at: float
+    negated: bool = False
+    hits: int = 0
+
+
+class SemanticCache:
+    """LRU cache of answers, looked up by similarity of the question.
+
+    A question never matches one of opposite polarity ("do you like python?"
+    and "do you not like python?"), however similar their embeddings are.
+    Entries expire after `ttl` seconds and the least recently used one is
+    dropped beyond `max_entries`. `rekey()` with a new preamble fingerprint
+    empties the cache.
+    """
+
+    def __init__(
+        self,
+        fingerprint: str = "",
+        threshold: float = TWIN_CACHE_THRESHOLD,
+        ttl: float = TWIN_CACHE_TTL,
+        max_entries: int = TWIN_CACHE_SIZE,
+        embed: Optional[Callable[[str], Embedding]] = None,
+    ):
+        self.fingerprint = fingerprint
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if embed is None:
+            embed = model_embedder() if TWIN_EMBED_MODEL else hashed_embedding
+        self.embed = embed
+        self.entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def rekey(self, fingerprint: str):
+        """Switch to another persona version, dropping answers of the old one."""
+        if fingerprint != self.fingerprint:
+            self.fingerprint = fingerprint
+            self.entries.clear()
+
+    def _expire(self, now: float):
+        for entry_id in [i for i, e in self.entries.items() if now - e.created_at > self.ttl]:
+            del self.entries[entry_id]
+
+    def _nearest(self, embedding: Embedding, negated: bool):
+        best_id, best = None, 0.0
+        for entry_id, entry in self.entries.items():
+            if entry.negated != negated:
+                continue
+            score = similarity(embedding, entry.embedding)
+            if score > best:
+                best_id, best = entry_id, score
+        return best_id, best
+
+    def lookup(self, prompt: str, history: Optional[List[dict]] = None) -> Optional[CacheEntry]:
+        if not is_standalone(prompt, history):
+            return None
+        self._expire(time.time())
+        embedding = self.embed(prompt)
+        entry_id, score = self._nearest(embedding, is_negated(prompt)) if embedding else (None, 0.0)
+        if entry_id is None or score < self.threshold:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(entry_id)
+        entry = self.entries[entry_id]
+        entry.hits += 1
+        self.hits += 1
+        return entry
+
+    def get(self, prompt: str, history: Optional[List[dict]] = None) -> Optional[str]:
+        """Cached answer to a question close to `prompt`, or None."""
+        entry = self.lookup(prompt, history)
+        return entry.answer if entry else None
+
+    def put(self, prompt: str, answer: str, history: Optional[List[dict]] = None):
+        """Cache `answer` unless `prompt` depends on the conversation."""
+        if not answer.strip() or not is_standalone(prompt, history):
+            return
+        embedding = self.embed(prompt)
+        if not embedding:
+            return
+        negated = is_negated(prompt)
+        entry_id, score = self._nearest(embedding, negated)
+        if entry_id is not None and score >= self.threshold:
+            # Answered concurrently by another session; keep the first answer
+            return
+        self.entries[self._next_id] = CacheEntry(prompt, embedding, answer, time.time(), negated)
+        self._next_id += 1
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,350 @@
+"""
+Multi-session digital twin server.
+
+    python server.py --port 8080
+
+Serves the persona to many users at once over HTTP and WebSocket:
+
+    POST   /sessions                  -> {"session_id": ...}
+    POST   /sessions/{id}/chat        {"message": ...} -> SSE stream of the reply
+    GET    /sessions/{id}             -> memory state of the session
+    DELETE /sessions/{id}
+    GET    /ws?session_id={id}        WebSocket: send {"message": ...}, receive
+                                      {"type": "token"} events and a final "done"
+    GET    /health
+
+The preamble is compiled once from `character.json` and shared by every
+session; each session has its own `ConversationMemory`. Upstream requests
+go through one pooled aiohttp session, and replies are streamed token by
+token to each client. Questions close to one already answered are served
+from a `SemanticCache` without an upstream call; editing `character.json`
+recompiles the preamble and empties the cache.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+from alith import Agent
+from dotenv import load_dotenv
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from memory import ConversationMemory, allm_summarizer
+from preamble import CompiledPreamble, compile_preamble, load_character
+from semantic_cache import TWIN_CACHE_SIZE, SemanticCache
+from streaming import STREAM_TIMEOUT, StreamStats, astream_prompt
+
+# Idle seconds before a session and its memory are dropped
+TWIN_SESSION_TTL = float(os.getenv("TWIN_SESSION_TTL", "3600"))
+TWIN_MAX_SESSIONS = int(os.getenv("TWIN_MAX_SESSIONS", "10000"))
+# Connections kept open to the upstream model
+TWIN_UPSTREAM_CONNECTIONS = int(os.getenv("TWIN_UPSTREAM_CONNECTIONS", "100"))
+TWIN_MODEL = os.getenv("TWIN_MODEL", "llama-3.3-70b-versatile")
+TWIN_BASE_URL = os.getenv("TWIN_BASE_URL", "https://api.groq.com/openai/v1")
+
+
+def error_body(message: str, type: str) -> dict:
+    return {"error": {"message": message, "type": type}}
+
+
+class TwinSession:
+    def __init__(self, session_id: str, memory: ConversationMemory):
+        self.id = session_id
+        self.memory = memory
+        # One turn at a time per session, so replies land in memory in order
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+        self.compaction: Optional[asyncio.Task] = None
+
+
+class TwinServer:
+    def __init__(
+        self,
+        agent: Agent,
+        preamble: CompiledPreamble,
+        upstream_connections: int = TWIN_UPSTREAM_CONNECTIONS,
+        session_ttl: float = TWIN_SESSION_TTL,
+        max_sessions: int = TWIN_MAX_SESSIONS,
+        cache: Optional[SemanticCache] = None,
+        character_path: Optional[Path] = None,
+    ):
+        self.agent = agent
+        self.preamble = preamble
+        self.cache = cache
+        if cache is not None:
+            cache.rekey(preamble.fingerprint)
+        self.character_path = character_path
+        self._character_mtime = character_path.stat().st_mtime if character_path else None
+        self._character_checked = time.monotonic()
+        self.upstream_connections = upstream_connections
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, TwinSession]" = OrderedDict()
+        self.http: Optional[aiohttp.ClientSession] = None
+        self.turns = 0
+
+    async def start(self, app: web.Application):
+        connector = aiohttp.TCPConnector(limit=self.upstream_connections, keepalive_timeout=60)
+        self.http = aiohttp.ClientSession(
+            connector=connector, timeout=aiohttp.ClientTimeout(total=STREAM_TIMEOUT)
+        )
+        self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self, app: web.Application):
+        self._sweeper.cancel()
+        for session in self.sessions.values():
+            if session.compaction:
+                session.compaction.cancel()
+        await self.http.close()
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(min(self.session_ttl, 60))
+            cutoff = time.monotonic() - self.session_ttl
+            for session_id in [s.id for s in self.sessions.values() if s.last_active < cutoff]:
+                self.sessions.pop(session_id, None)
+
+    def create_session(self) -> TwinSession:
+        session_id = uuid.uuid4().hex
+        memory = ConversationMemory(
+            allm_summarizer(self.agent, session=self.http, **self.preamble.cache_params)
+        )
+        session = self.sessions[session_id] = TwinSession(session_id, memory)
+        while len(self.sessions) > self.max_sessions:
+            # Least recently active first
+            self.sessions.popitem(last=False)
+        return session
+
+    def get_session(self, session_id: str) -> Optional[TwinSession]:
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.last_active = time.monotonic()
+            self.sessions.move_to_end(session_id)
+        return session
+
+    def check_character(self):
+        """Recompile the preamble if `character.json` changed, at most once a second."""
+        now = time.monotonic()
+        if self.character_path is None or now - self._character_checked < 1:
+            return
+        self._character_checked = now
+        mtime = self.character_path.stat().st_mtime
+        if mtime == self._character_mtime:
+            return
+        self._character_mtime = mtime
+        preamble = compile_preamble(load_character(self.character_path))
+        if preamble.fingerprint != self.preamble.fingerprint:
+            self.preamble = preamble
+            self.agent.preamble = preamble.text
+            if self.cache is not None:
+                self.cache.rekey(preamble.fingerprint)
+
+    async def turn(self, session: TwinSession, message: str):
+        """Stream one reply, yielding ("token", text) and finally ("done", stats)."""
+        async with session.lock:
+            if session.compaction and not session.compaction.done():
+                # The summary from the last turn is still being written
+                await session.compaction
+            self.check_character()
+            history = session.memory.messages()
+            stats = StreamStats()
+            cached = self.cache.get(message, history) if self.cache is not None else None
+            if cached is not None:
+                stats.first_token_at = stats.finished_at = time.perf_counter()
+                stats.chunks = 1
+                reply, prompt_tokens = cached, 0
+                yield "token", cached
+            else:
+                prompt_tokens = session.memory.request_tokens(self.preamble.text, message)
+                fingerprint = self.preamble.fingerprint
+                pieces = []
+                async for token in astream_prompt(
+                    self.agent,
+                    message,
+                    history=history,
+                    stats=stats,
+                    session=self.http,
+                    **self.preamble.cache_params,
+                ):
+                    pieces.append(token)
+                    yield "token", token
+                reply = "".join(pieces)
+                # Not if the persona changed while this reply was written
+                if self.cache is not None and fingerprint == self.cache.fingerprint:
+                    self.cache.put(message, reply, history)
+            session.memory.add_turn(message, reply)
+            self.turns += 1
+            if session.memory.needs_compaction:
+                # Summarize after the reply is out, before this session's next turn
+                session.compaction = asyncio.create_task(self._compact(session))
+            yield "done", {
+                "ttft": stats.ttft,
+                "tokens": stats.tokens,
+                "tokens_per_second": stats.tokens_per_second,
+                "prompt_tokens": prompt_tokens,
+                "cached": cached is not None,
+            }
+
+    async def _compact(self, session: TwinSession):
+        try:
+            await session.memory.acompact()
+        except Exception as e:
+            # The turns stay pending and are retried after the next turn
+            print(f"Summary for session {session.id} failed: {e}")
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "status": "ok",
+                "sessions": len(self.sessions),
+                "turns": self.turns,
+                "preamble": self.preamble.fingerprint,
+                "cache": {
+                    "entries": len(self.cache),
+                    "hits": self.cache.hits,
+                    "misses": self.cache.misses,
+                }
+                if self.cache is not None
+                else None,
+            }
+        )
+
+    async def create(self, request: web.Request) -> web.Response:
+        session = self.create_session()
+        return web.json_response({"session_id": session.id}, status=201)
+
+    def _session_or_404(self, request: web.Request) -> TwinSession:
+        session = self.get_session(request.match_info.get("session_id") or request.query.get("session_id", ""))
+        if session is None:
+            raise web.HTTPNotFound(
+                text=json.dumps(error_body("Session not found", "not_found_error")),
+                content_type="application/json",
+            )
+        return session
+
+    async def show(self, request: web.Request) -> web.Response:
+        session = self._session_or_404(request)
+        memory = session.memory
+        return web.json_response(
+            {
+                "session_id": session.id,
+                "turns": memory.turns,
+                "window": len(memory.window),
+                "summaries": memory.summaries,
+                "history_tokens": memory.history_tokens(),
+            }
+        )
+
+    async def delete(self, request: web.Request) -> web.Response:
+        session = self._session_or_404(request)
+        self.sessions.pop(session.id, None)
+        return web.Response(status=204)
+
+    async def _message(self, request: web.Request) -> str:
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            body = None
+        message = body.get("message") if isinstance(body, dict) else None
+        if not isinstance(message, str) or not message.strip():
+            raise web.HTTPBadRequest(
+                text=json.dumps(error_body("'message' must be a non-empty string", "invalid_request_error")),
+                content_type="application/json",
+            )
+        return message
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        session = self._session_or_404(request)
+        message = await self._message(request)
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        await response.prepare(request)
+        try:
+            async for kind, data in self.turn(session, message):
+                event = {"text": data} if kind == "token" else data
+                await response.write(f"event: {kind}\ndata: {json.dumps(event)}\n\n".encode())
+        except Exception as e:
+            event = error_body(f"Upstream model error: {e}", "upstream_error")
+            await response.write(f"event: error\ndata: {json.dumps(event)}\n\n".encode())
+        await response.write_eof()
+        return response
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        session = self.get_session(request.query.get("session_id", "")) or self.create_session()
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        await ws.send_json({"type": "session", "session_id": session.id})
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            try:
+                message = json.loads(msg.data).get("message")
+            except (json.JSONDecodeError, AttributeError):
+                message = None
+            if not isinstance(message, str) or not message.strip():
+                await ws.send_json(
+                    {"type": "error", **error_body("'message' must be a non-empty string", "invalid_request_error")}
+                )
+                continue
+            session.last_active = time.monotonic()
+            try:
+                async for kind, data in self.turn(session, message):
+                    await ws.send_json({"type": kind, "text": data} if kind == "token" else {"type": kind, **data})
+            except Exception as e:
+                await ws.send_json({"type": "error", **error_body(f"Upstream model error: {e}", "upstream_error")})
+        return ws
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.on_startup.append(self.start)
+        app.on_cleanup.append(self.stop)
+        app.router.add_get("/health", self.health)
+        app.router.add_post("/sessions", self.create)
+        app.router.add_get("/sessions/{session_id}", self.show)
+        app.router.add_delete("/sessions/{session_id}", self.delete)
+        app.router.add_post("/sessions/{session_id}/chat", self.chat)
+        app.router.add_get("/ws", self.websocket)
+        return app
+
+
+def create_server(
+    character_path: Path = Path(__file__).parent / "character.json",
+    base_url: str = TWIN_BASE_URL,
+    api_key: Optional[str] = None,
+    model: str = TWIN_MODEL,
+    **kwargs,
+) -> TwinServer:
+    preamble = compile_preamble(load_character(character_path))
+    kwargs.setdefault("cache", SemanticCache(preamble.fingerprint) if TWIN_CACHE_SIZE else None)
+    agent = Agent(
+        model=model,
+        api_key=api_key or os.getenv("GROQ_API_KEY") or os.getenv("OPENAI_API_KEY"),
+        preamble=preamble.text,
+        base_url=base_url,
+    )
+    return TwinServer(agent, preamble, character_path=character_path, **kwargs)
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Multi-session digital twin server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    server = create_server()
+    print(f"🤖 Abi.Lazai twin serving on http://{args.host}:{args.port} (preamble {server.preamble.fingerprint[:12]})")
+    web.run_app(server.app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+from semantic_cache import SemanticCache, hashed_embedding, is_negated, similarity
+
+
+def test_negated_question_is_not_served_the_cached_answer():
+    cache = SemanticCache("persona")
+    cache.put("do you like python?", "Yes, Python is my go-to! 🐍")
+    # Close enough to pass the threshold on similarity alone
+    assert similarity(hashed_embedding("do you like python?"), hashed_embedding("do you not like python?")) >= cache.threshold
+    assert cache.get("do you not like python?") is None
+    assert cache.get("don't you like python?") is None
+    assert cache.get("do you like Python") == "Yes, Python is my go-to! 🐍"
+
+
+def test_negated_questions_share_answers_with_each_other():
+    cache = SemanticCache("persona")
+    cache.put("do you not like python?", "I do like it!")
+    cache.put("do you like python?", "Yes!")
+    assert cache.get("Do you NOT like Python?") == "I do like it!"
+    assert cache.get("do you like python?") == "Yes!"
+    assert not is_negated("not never")
@@ -0,0 +1,33 @@
+import re
+from functools import lru_cache
+
+# Without tiktoken: words split into pieces of up to 4 characters plus each
+# symbol or emoji, which tracks BPE token counts closely enough for budgets
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+@lru_cache(maxsize=None)
+def _encoding():
+    # Loaded on first use: tiktoken downloads the BPE file the first time, and
+    # a failed download (offline, proxy) falls back to the estimate below
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count of `text`, exact with tiktoken installed and estimated otherwise."""
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(_TOKEN_RE.findall(text))
+
+
+def count_message_tokens(messages) -> int:
+    """Prompt tokens of chat messages, including the per-message framing."""
+    return sum(4 + count_tokens(message.get("content") or "") for message in messages) + 2
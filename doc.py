@@ -1,19 +1,16 @@
 from alith import Agent, LazAIClient
+
+from session import bootstrap
  
 # 1. Join the iDAO, register user wallet on LazAI and deposit fees (Only Once)
 LAZAI_IDAO_ADDRESS = "0xD878Fa6c04d99654Fb38d1245Fc6Ec2acE8913f0" # Replace with your own address
 client = LazAIClient()
 
-try:
-    client.get_user(client.wallet.address)
-    print("User already exists")
-except Exception:
-    print("User does not exist, adding user")
-    client.add_user(10000000)
-    client.deposit_inference(LAZAI_IDAO_ADDRESS, 1000000)
+# Registration, deposit and node url are cached locally; no chain calls while fresh
+session = bootstrap(client, LAZAI_IDAO_ADDRESS, user_amount=10000000, deposit_amount=1000000)
 # 2. Request the inference server with the settlement headers and DAT file id
 file_id = 2091  # Use the File ID you received from the Data Contribution step
-url = client.get_inference_node(LAZAI_IDAO_ADDRESS)[1]
+url = session.url
 print("url", url)
 agent = Agent(
     # Note: replace with your model here
@@ -23,4 +20,5 @@ agent = Agent(
     # Extra headers for settlement and DAT file anchoring
     extra_headers=client.get_request_headers(LAZAI_IDAO_ADDRESS, file_id=file_id),
 )
+# Not streamed: the settlement node bills tokens by parsing the whole response body as JSON
 print(agent.prompt("summarize it"))
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Shared LazAI session bootstrap for the inference and query clients.
+
+    from session import bootstrap
+
+    session = bootstrap(client, LAZAI_IDAO_ADDRESS, user_amount=10000000, deposit_amount=1000000)
+    agent = Agent(model=..., base_url=f"{session.url}/v1", extra_headers=...)
+
+The verified user, the node URL and the account balance are snapshotted in
+`LAZAI_SESSION_PATH` for `LAZAI_SESSION_TTL` seconds. Within that window a
+script makes no chain calls before its first request; a stale snapshot is
+refreshed with one batched read, and transactions are only sent when the
+user is not registered or the node account is below `min_balance`.
+"""
+
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+# Batched chain reads are shared with the week 3 tools
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Build_chill_w3"))
+from reads import ChainReader
+
+SESSION_PATH = os.getenv(
+    "LAZAI_SESSION_PATH", os.path.join(os.path.expanduser("~"), ".lazai_session.json")
+)
+SESSION_TTL = float(os.getenv("LAZAI_SESSION_TTL", "3600"))
+
+
+@dataclass
+class Session:
+    user: str
+    node: str
+    kind: str
+    url: str
+    # The user's account balance with the node, and unallocated settlement balance
+    balance: int
+    available: int
+    checked_at: float
+    cached: bool = False
+
+
+def _key(client, node: str, kind: str) -> str:
+    return f"{client.config.chain_id}:{kind}:{client.wallet.address}:{node}".lower()
+
+
+def _load(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save(path: str, snapshots: dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshots, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _read(reader: ChainReader, node: str, kind: str) -> tuple:
+    """(user, account, node) records in one batched round trip.
+
+    `user` is None when the wallet is not registered, `account` when it has
+    no account with the node yet.
+    """
+    wallet = reader.client.wallet.address
+    records = reader.settlement(wallet, node, kind)
+    account = records["account"]
+    if account is not None and account[0] != wallet:
+        account = None
+    return records["user"], account, records["node"]
+
+
+def invalidate(client, node: str, kind: str = "inference", path: str = SESSION_PATH):
+    """Drop the snapshot, e.g. after the node rejected a request for lack of funds."""
+    snapshots = _load(path)
+    if snapshots.pop(_key(client, node, kind), None) is not None:
+        _save(path, snapshots)
+
+
+def bootstrap(
+    client,
+    node: str,
+    kind: str = "inference",
+    user_amount: int = 0,
+    deposit_amount: int = 0,
+    min_balance: int = 1,
+    ttl: float = SESSION_TTL,
+    path: str = SESSION_PATH,
+    refresh: bool = False,
+) -> Session:
+    """Return a verified session with `node`, touching the chain only when needed.
+
+    An unregistered wallet is added with `user_amount`, and an account
+    balance below `min_balance` is topped up with `deposit_amount`; with
+    either amount left at 0 that case raises instead.
+    """
+    snapshots = _load(path)
+    key = _key(client, node, kind)
+    snapshot: Optional[dict] = snapshots.get(key)
+    if (
+        snapshot
+        and not refresh
+        and time.time() - snapshot["checked_at"] < ttl
+        and snapshot["balance"] >= min_balance
+    ):
+        return Session(**snapshot, cached=True)
+
+    reader = ChainReader(client)
+    user, account, node_record = _read(reader, node, kind)
+    sent = False
+    if user is None:
+        if not user_amount:
+            raise RuntimeError(f"{client.wallet.address} is not registered with LazAI")
+        print("User does not exist, adding user")
+        client.add_user(user_amount)
+        sent = True
+    balance = account[3] if account else 0
+    if balance < min_balance:
+        if not deposit_amount:
+            raise RuntimeError(f"{kind} account balance with {node} is {balance}, below {min_balance}")
+        available = user[1] if user else user_amount
+        if available < deposit_amount:
+            client.deposit(deposit_amount)
+        getattr(client, f"deposit_{kind}")(node, deposit_amount)
+        print(f"Deposited {deposit_amount} with {kind} node {node}")
+        sent = True
+    if sent:
+        user, account, node_record = _read(reader, node, kind)
+
+    session = Session(
+        user=client.wallet.address,
+        node=node,
+        kind=kind,
+        url=node_record[1],
+        balance=account[3] if account else 0,
+        available=user[1] if user else 0,
+        checked_at=time.time(),
+    )
+    snapshots[key] = {k: v for k, v in asdict(session).items() if k != "cached"}
+    _save(path, snapshots)
+    return session
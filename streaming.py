@@ -0,0 +1,238 @@
+"""
+Streaming prompts for `alith.Agent` over OpenAI-compatible endpoints.
+
+`Agent.prompt` returns only once the whole completion has been generated.
+These helpers send the same request (the agent's model, preamble, api key,
+base url and extra headers) to `{base_url}/chat/completions` with
+`"stream": true` and yield text as the server-sent events arrive:
+
+    stats = StreamStats()
+    for token in stream_prompt(agent, "hi", stats=stats):
+        print(token, end="", flush=True)
+    print(stats)  # time to first token and tokens/s
+
+`astream_prompt` is the async generator equivalent, over an optional shared
+aiohttp session. A server that answers with a plain JSON completion instead
+of an event stream has its reply yielded in one piece; an error body raises
+`StreamError`.
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator, List, Optional
+
+import aiohttp
+import requests
+
+STREAM_TIMEOUT = float(os.getenv("STREAM_TIMEOUT", "120"))
+
+
+# Returned by `_parse_line` at the end-of-stream marker
+_DONE = object()
+
+
+class StreamError(Exception):
+    pass
+
+
+@dataclass
+class StreamStats:
+    started_at: float = field(default_factory=time.perf_counter)
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    chunks: int = 0
+    # Reported by the server in a final usage block, when it sends one
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from sending the request to the first token."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def tokens(self) -> int:
+        # Without a usage block, each content delta counts as one token
+        return self.completion_tokens or self.chunks
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Generation rate after the first token."""
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        elapsed = self.finished_at - self.first_token_at
+        return (self.tokens - 1) / elapsed if elapsed > 0 and self.tokens > 1 else None
+
+    def __str__(self) -> str:
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "-"
+        rate = f"{self.tokens_per_second:.1f}" if self.tokens_per_second is not None else "-"
+        return f"TTFT {ttft}, {rate} tokens/s ({self.tokens} tokens)"
+
+
+def build_messages(agent, prompt: str, history: Optional[List[dict]] = None) -> List[dict]:
+    messages = []
+    if agent.preamble:
+        messages.append({"role": "system", "content": agent.preamble})
+    messages.extend(history or [])
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def _request(agent, messages: List[dict], usage: bool, params: dict) -> tuple:
+    if not agent.base_url:
+        raise ValueError("Streaming needs agent.base_url set to an OpenAI-compatible endpoint")
+    url = f"{agent.base_url.rstrip('/')}/chat/completions"
+    headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+    headers.update(agent.extra_headers or {})
+    api_key = agent.api_key or os.getenv("OPENAI_API_KEY")
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    body = {"model": agent.model, "messages": messages, "stream": True, **params}
+    if usage:
+        body["stream_options"] = {"include_usage": True}
+    return url, headers, body
+
+
+def _parse_line(line: str, stats: StreamStats):
+    """Return the text carried by one SSE line, `_DONE` at the end marker, or None."""
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return _DONE
+    event = json.loads(data)
+    if "error" in event:
+        error = event["error"]
+        raise StreamError(error.get("message", str(error)) if isinstance(error, dict) else str(error))
+    usage = event.get("usage") or (event.get("x_groq") or {}).get("usage")
+    if usage:
+        stats.prompt_tokens = usage.get("prompt_tokens")
+        stats.completion_tokens = usage.get("completion_tokens")
+    for choice in event.get("choices") or []:
+        text = (choice.get("delta") or {}).get("content")
+        if text:
+            if stats.first_token_at is None:
+                stats.first_token_at = time.perf_counter()
+            stats.chunks += 1
+            return text
+    return None
+
+
+def _parse_body(text: str, stats: StreamStats) -> str:
+    """Text of a non-streamed (JSON) reply to a streamed request."""
+    try:
+        body = json.loads(text)
+    except json.JSONDecodeError:
+        raise StreamError(f"Expected an event stream or JSON completion, got: {text[:200]}")
+    if isinstance(body, dict) and "error" in body:
+        error = body["error"]
+        raise StreamError(error.get("message", str(error)) if isinstance(error, dict) else str(error))
+    try:
+        content = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        raise StreamError(f"Unexpected completion body: {text[:200]}")
+    usage = body.get("usage") or {}
+    stats.prompt_tokens = usage.get("prompt_tokens")
+    stats.completion_tokens = usage.get("completion_tokens")
+    stats.first_token_at = time.perf_counter()
+    stats.chunks += 1
+    return content or ""
+
+
+def _is_json(content_type: Optional[str]) -> bool:
+    return "json" in (content_type or "")
+
+
+def stream_prompt(
+    agent,
+    prompt: str,
+    history: Optional[List[dict]] = None,
+    stats: Optional[StreamStats] = None,
+    usage: bool = False,
+    timeout: float = STREAM_TIMEOUT,
+    **params,
+) -> Iterator[str]:
+    """Yield the completion of `prompt` piece by piece as the server streams it.
+
+    `history` is a list of prior {"role", "content"} messages sent between
+    the preamble and the prompt; `usage` asks the server for a final token
+    count; extra keyword arguments go into the request body.
+    """
+    stats = stats if stats is not None else StreamStats()
+    url, headers, body = _request(agent, build_messages(agent, prompt, history), usage, params)
+    stats.started_at = time.perf_counter()
+    with requests.post(url, headers=headers, json=body, stream=True, timeout=timeout) as response:
+        if response.status_code != 200:
+            raise StreamError(f"Streaming request failed ({response.status_code}): {response.text}")
+        if _is_json(response.headers.get("Content-Type")):
+            # The server ignored "stream": the whole reply comes in one body
+            text = _parse_body(response.text, stats)
+            # No generation rate to report for a reply that arrived whole
+            stats.finished_at = stats.first_token_at
+            if text:
+                yield text
+            return
+        events = 0
+        for line in response.iter_lines():
+            line = line.decode("utf-8")
+            events += line.startswith("data:")
+            text = _parse_line(line, stats)
+            if text is _DONE:
+                break
+            if text:
+                yield text
+    if not events:
+        raise StreamError("The server closed the stream without sending any events")
+    stats.finished_at = time.perf_counter()
+
+
+async def astream_prompt(
+    agent,
+    prompt: str,
+    history: Optional[List[dict]] = None,
+    stats: Optional[StreamStats] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    usage: bool = False,
+    timeout: float = STREAM_TIMEOUT,
+    **params,
+) -> AsyncIterator[str]:
+    """`stream_prompt` for the event loop; pass `session` to reuse connections."""
+    stats = stats if stats is not None else StreamStats()
+    url, headers, body = _request(agent, build_messages(agent, prompt, history), usage, params)
+    own_session = session is None
+    if own_session:
+        session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout))
+    stats.started_at = time.perf_counter()
+    try:
+        async with session.post(url, headers=headers, json=body) as response:
+            if response.status != 200:
+                raise StreamError(
+                    f"Streaming request failed ({response.status}): {await response.text()}"
+                )
+            if _is_json(response.headers.get("Content-Type")):
+                # The server ignored "stream": the whole reply comes in one body
+                text = _parse_body(await response.text(), stats)
+                # No generation rate to report for a reply that arrived whole
+                stats.finished_at = stats.first_token_at
+                if text:
+                    yield text
+                return
+            events = 0
+            async for line in response.content:
+                line = line.decode("utf-8")
+                events += line.startswith("data:")
+                text = _parse_line(line, stats)
+                if text is _DONE:
+                    break
+                if text:
+                    yield text
+            if not events:
+                raise StreamError("The server closed the stream without sending any events")
+    finally:
+        if own_session:
+            await session.close()
+    stats.finished_at = time.perf_counter()